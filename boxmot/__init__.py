@@ -2,16 +2,31 @@
 
 __version__ = '12.0.7'
 
-from boxmot.postprocessing.gsi import gsi
+import importlib
+
 from boxmot.tracker_zoo import create_tracker, get_tracker_config
-from boxmot.trackers.botsort.botsort import BotSort
-from boxmot.trackers.bytetrack.bytetrack import ByteTrack
-from boxmot.trackers.deepocsort.deepocsort import DeepOcSort
-from boxmot.trackers.hybridsort.hybridsort import HybridSort
-from boxmot.trackers.ocsort.ocsort import OcSort
-from boxmot.trackers.strongsort.strongsort import StrongSort
-from boxmot.trackers.imprassoc.imprassoctrack import ImprAssocTrack
-from boxmot.trackers.boosttrack.boosttrack import BoostTrack
+
+# Tracker classes and gsi are imported on first access, so that e.g. importing boxmot
+# for a motion-only tracker does not pull in torch and the ReID model zoo.
+_LAZY_ATTRS = {
+    'gsi': 'boxmot.postprocessing.gsi',
+    'BotSort': 'boxmot.trackers.botsort.botsort',
+    'ByteTrack': 'boxmot.trackers.bytetrack.bytetrack',
+    'DeepOcSort': 'boxmot.trackers.deepocsort.deepocsort',
+    'HybridSort': 'boxmot.trackers.hybridsort.hybridsort',
+    'OcSort': 'boxmot.trackers.ocsort.ocsort',
+    'StrongSort': 'boxmot.trackers.strongsort.strongsort',
+    'ImprAssocTrack': 'boxmot.trackers.imprassoc.imprassoctrack',
+    'BoostTrack': 'boxmot.trackers.boosttrack.boosttrack',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        attr = getattr(importlib.import_module(_LAZY_ATTRS[name]), name)
+        globals()[name] = attr
+        return attr
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 TRACKERS = ['bytetrack', 'botsort', 'strongsort', 'ocsort', 'deepocsort', 'hybridsort', 'imprassoc', 'boosttrack']
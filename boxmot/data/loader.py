@@ -6,10 +6,24 @@ import numpy as np
 from pathlib import Path
 from PIL import Image
 
+from boxmot.utils import logger as LOGGER
+
 
 VID_FORMATS = "asf", "avi", "gif", "m4v", "mkv", "mov", "mp4", "mpeg", "mpg", "ts", "wmv"  # include video suffixes
 
 
+def open_capture(src):
+    """
+    Open a cv2.VideoCapture with the driver-side frame buffer reduced to a single frame,
+    so that live sources hand out the most recent frame instead of a queued stale one.
+    """
+    cap = cv2.VideoCapture(src)
+    if not cap.set(cv2.CAP_PROP_BUFFERSIZE, 1):
+        # file backends typically do not support this property, which is harmless there
+        LOGGER.debug("Failed to reduce capture buffer size for {}", src)
+    return cap
+
+
 class LoadImagesAndVideos:
     """
     A data loader for handling both images and videos, providing batches of frames or images for processing.
@@ -117,7 +131,7 @@ class LoadImagesAndVideos:
 
     def _start_video(self, path):
         """Initialize video capture for a new video file."""
-        self.cap = cv2.VideoCapture(path)
+        self.cap = open_capture(path)
         if not self.cap.isOpened():
             raise FileNotFoundError(f"Failed to open video {path}")
         self.fps = int(self.cap.get(cv2.CAP_PROP_FPS))
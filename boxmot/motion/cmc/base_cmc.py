@@ -16,10 +16,11 @@ class BaseCMC(ABC):
         mask = np.zeros_like(img)
 
         mask[int(0.02 * h): int(0.98 * h), int(0.02 * w): int(0.98 * w)] = 255
-        if dets is not None:
-            for det in dets:
-                tlbr = np.multiply(det, scale).astype(int)
-                mask[tlbr[1]:tlbr[3], tlbr[0]:tlbr[2]] = 0
+        if dets is not None and len(dets) > 0:
+            # scale all boxes in one op; each box is then a plain slice write into the mask
+            tlbrs = (np.asarray(dets)[:, :4] * scale).astype(int)
+            for x1, y1, x2, y2 in tlbrs.tolist():
+                mask[y1:y2, x1:x2] = 0
 
         return mask
 
@@ -50,6 +50,19 @@ class BaseKalmanFilter:
         covariance = np.diag(np.square(std))
         return mean, covariance
 
+    def multi_initiate(self, measurement: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Create tracks from unassociated measurements (Vectorized version).
+        """
+        mean = np.hstack((measurement, np.zeros_like(measurement)))
+
+        # the per-track std terms index measurement[k], which selects column k of the transpose
+        std = np.stack(np.broadcast_arrays(*self._get_initial_covariance_std(measurement.T)), axis=1)
+        covariance = np.zeros((len(measurement), 2 * self.ndim, 2 * self.ndim))
+        diag = np.arange(2 * self.ndim)
+        covariance[:, diag, diag] = np.square(std)
+        return mean, covariance
+
     def _get_initial_covariance_std(self, measurement: np.ndarray) -> np.ndarray:
         """
         Return initial standard deviations for the covariance matrix.
@@ -106,12 +119,13 @@ class BaseKalmanFilter:
         std_pos, std_vel = self._get_multi_process_noise_std(mean)
         sqr = np.square(np.r_[std_pos, std_vel]).T
 
-        motion_cov = [np.diag(sqr[i]) for i in range(len(mean))]
-        motion_cov = np.asarray(motion_cov)
-
         mean = np.dot(mean, self._motion_mat.T)
         left = np.dot(self._motion_mat, covariance).transpose((1, 0, 2))
-        covariance = np.dot(left, self._motion_mat.T) + motion_cov
+        covariance = np.dot(left, self._motion_mat.T)
+        # the motion noise is diagonal, so add it on the diagonals of the fresh
+        # product instead of stacking one dense (2 * ndim)^2 matrix per track
+        diag = np.arange(sqr.shape[1])
+        covariance[:, diag, diag] += sqr
 
         return mean, covariance
 
@@ -129,6 +143,26 @@ class BaseKalmanFilter:
         new_covariance = covariance - np.linalg.multi_dot((kalman_gain, projected_cov, kalman_gain.T))
         return new_mean, new_covariance
 
+    def multi_update(self, mean: np.ndarray, covariance: np.ndarray, measurement: np.ndarray, confidence=0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run Kalman filter correction step (Vectorized version). `confidence` is a scalar
+        or one detection confidence per track.
+        """
+        std = np.asarray(self._get_multi_measurement_noise_std(mean)).T
+        std = std * (1 - np.reshape(confidence, (-1, 1)))  # NSA scaling, as in `project`
+        innovation_cov = np.square(std)[:, :, None] * np.eye(self.ndim)
+
+        projected_mean = np.dot(mean, self._update_mat.T)
+        projected_cov = self._update_mat @ covariance @ self._update_mat.T + innovation_cov
+
+        # K = P H^T S^-1, solved for all tracks at once from S K^T = H P
+        kalman_gain = np.linalg.solve(projected_cov, self._update_mat @ covariance).transpose((0, 2, 1))
+        innovation = measurement - projected_mean
+
+        new_mean = mean + np.einsum('nij,nj->ni', kalman_gain, innovation)
+        new_covariance = covariance - kalman_gain @ projected_cov @ kalman_gain.transpose((0, 2, 1))
+        return new_mean, new_covariance
+
     def _get_multi_process_noise_std(self, mean: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
         Return standard deviations for process noise in vectorized form.
@@ -136,6 +170,13 @@ class BaseKalmanFilter:
         """
         raise NotImplementedError
 
+    def _get_multi_measurement_noise_std(self, mean: np.ndarray) -> np.ndarray:
+        """
+        Return standard deviations for measurement noise in vectorized form.
+        Should be implemented by subclasses.
+        """
+        raise NotImplementedError
+
     def gating_distance(self, mean: np.ndarray, covariance: np.ndarray, measurements: np.ndarray, only_position: bool = False, metric: str = 'maha') -> np.ndarray:
         """
         Compute gating distance between state distribution and measurements.
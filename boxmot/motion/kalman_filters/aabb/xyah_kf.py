@@ -71,3 +71,12 @@ class KalmanFilterXYAH(BaseKalmanFilter):
             self._std_weight_velocity * mean[:, 3]
         ]
         return std_pos, std_vel
+
+    def _get_multi_measurement_noise_std(self, mean: np.ndarray) -> np.ndarray:
+        std_noise = [
+            self._std_weight_position * mean[:, 3],
+            self._std_weight_position * mean[:, 3],
+            1e-1 * np.ones_like(mean[:, 3]),
+            self._std_weight_position * mean[:, 3]
+        ]
+        return std_noise
@@ -62,3 +62,12 @@ class KalmanFilterXYWH(BaseKalmanFilter):
             self._std_weight_velocity * mean[:, 3]
         ]
         return std_pos, std_vel
+
+    def _get_multi_measurement_noise_std(self, mean: np.ndarray) -> np.ndarray:
+        std_noise = [
+            self._std_weight_position * mean[:, 2],
+            self._std_weight_position * mean[:, 3],
+            self._std_weight_position * mean[:, 2],
+            self._std_weight_position * mean[:, 3]
+        ]
+        return std_noise
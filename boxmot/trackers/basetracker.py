@@ -2,11 +2,24 @@ import numpy as np
 import cv2 as cv
 import hashlib
 import colorsys
+import queue
+import threading
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from boxmot.utils import logger as LOGGER
 from boxmot.utils.iou import AssociationFunction
 
 
+@lru_cache(maxsize=1024)
+def _hashed_bgr(key: str, saturation: float, value: float) -> tuple:
+    # Hash the key to get a consistent unique value and map the first
+    # few characters of the digest to a hue between 0 and 1
+    hue = int(hashlib.sha256(key.encode()).hexdigest()[:8], 16) / 0xffffffff
+    rgb = colorsys.hsv_to_rgb(hue, saturation, value)
+    # RGB from 0-1 to 0-255, reversed to BGR for OpenCV
+    return tuple(int(component * 255) for component in rgb)[::-1]
+
+
 class BaseTracker(ABC):
     def __init__(
         self, 
@@ -50,6 +63,7 @@ class BaseTracker(ABC):
         self.per_class_active_tracks = None
         self._first_frame_processed = False  # Flag to track if the first frame has been processed
         self._first_dets_processed = False
+        self._dets_buffer = np.empty((0, 0))  # see `append_det_indices`
         
         # Initialize per-class active tracks
         if self.per_class:
@@ -78,6 +92,100 @@ class BaseTracker(ABC):
         """
         raise NotImplementedError("The update method needs to be implemented by the subclass.")
     
+    def run_pipeline(self, frames, detect, sink=None, prefetch: int = 16, plot: bool = True,
+                     show_trajectories: bool = False) -> int:
+        """
+        Runs the tracker over a stream of frames with reading, tracking and writing decoupled
+        by bounded queues. A reader thread pulls frames from `frames`, the calling thread runs
+        `detect` and `update`, and a writer thread hands the results to `sink`, so frame
+        decoding and encoding overlap with detection, ReID and association. Plotting stays on
+        the calling thread, since `plot_results` reads the tracks as of the current frame.
+
+        Parameters:
+        - frames (Iterable[np.ndarray]): The frames to track, in order.
+        - detect (callable): Maps a frame to its detections (N, 6), or to a (dets, embs) tuple.
+        - sink (callable, optional): Called as sink(idx, img, tracks) on the writer thread,
+          e.g. to encode the annotated frame or store the tracks.
+        - prefetch (int): Maximum number of frames queued ahead of and behind the tracker.
+        - plot (bool): Whether to draw the active tracks on the frame before it is passed on.
+        - show_trajectories (bool): Whether to draw the trajectories when plotting.
+
+        Returns:
+        - int: The number of frames processed.
+        """
+        done = object()
+        read_q = queue.Queue(maxsize=prefetch)
+        write_q = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        errors = []
+
+        def put(q, item):
+            # give up once the pipeline is stopping, so a full queue cannot block forever
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def read():
+            try:
+                for frame in frames:
+                    if stop.is_set():
+                        break
+                    put(read_q, frame)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                put(read_q, done)
+
+        def write():
+            while True:
+                item = write_q.get()
+                if item is done:
+                    return
+                if errors:
+                    continue  # keep draining so the tracking thread never blocks
+                try:
+                    sink(*item)
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+
+        reader = threading.Thread(target=read, name="boxmot-reader", daemon=True)
+        writer = threading.Thread(target=write, name="boxmot-writer", daemon=True)
+        reader.start()
+        writer.start()
+
+        n = 0
+        try:
+            while not stop.is_set():
+                # poll, so a failing sink (which sets `stop`) cannot leave this thread
+                # waiting on a reader that gave up enqueuing `done`
+                try:
+                    frame = read_q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if frame is done:
+                    break
+                out = detect(frame)
+                dets, embs = out if isinstance(out, tuple) else (out, None)
+                tracks = self.update(dets, frame, embs)
+                if plot:
+                    frame = self.plot_results(frame, show_trajectories)
+                if sink is not None:
+                    put(write_q, (n, frame, tracks))
+                n += 1
+        finally:
+            stop.set()
+            write_q.put(done)
+            reader.join()
+            writer.join()
+
+        if errors:
+            raise errors[0]
+        return n
+
     def get_class_dets_n_embs(self, dets, embs, cls_id):
         # Initialize empty arrays for detections and embeddings
         class_dets = np.empty((0, 6))
@@ -155,7 +263,7 @@ class BaseTracker(ABC):
                     # Get detections and embeddings for the current class
                     class_dets, class_embs = self.get_class_dets_n_embs(dets, embs, cls_id)
                     
-                    LOGGER.debug(f"Processing class {int(cls_id)}: {class_dets.shape} with embeddings {class_embs.shape if class_embs is not None else None}")
+                    LOGGER.debug("Processing class {}: {} with embeddings {}", int(cls_id), class_dets.shape, None if class_embs is None else class_embs.shape)
 
                     # Activate the specific active tracks for this class id
                     self.active_tracks = self.per_class_active_tracks[cls_id]
@@ -201,6 +309,23 @@ class BaseTracker(ABC):
                 dets.shape[1] == 6
             ), "Unsupported 'dets' 2nd dimension lenght, valid lenghts is 6 (x1,y1,x2,y2,conf,cls)"
 
+    def append_det_indices(self, dets: np.ndarray) -> np.ndarray:
+        """
+        Returns `dets` with each row's index appended as an extra column.
+
+        The result is a view into a scratch buffer reused across frames, whose
+        index column is only written when the buffer grows. It is overwritten by
+        the next call, so anything kept beyond the current frame must be a copy
+        (e.g. a boolean-mask selection).
+        """
+        n, w = dets.shape
+        if len(self._dets_buffer) < n or self._dets_buffer.shape[1] != w + 1:
+            capacity = max(n, 2 * len(self._dets_buffer))
+            self._dets_buffer = np.empty((capacity, w + 1))
+            self._dets_buffer[:, w] = np.arange(capacity)
+        dets_ind = self._dets_buffer[:n]
+        dets_ind[:, :w] = dets
+        return dets_ind
 
     def id_to_color(self, id: int, saturation: float = 0.75, value: float = 0.95) -> tuple:
         """
@@ -215,27 +340,8 @@ class BaseTracker(ABC):
         - tuple: A tuple representing the BGR color.
         """
 
-        # Hash the ID to get a consistent unique value
-        hash_object = hashlib.sha256(str(id).encode())
-        hash_digest = hash_object.hexdigest()
-        
-        # Convert the first few characters of the hash to an integer
-        # and map it to a value between 0 and 1 for the hue
-        hue = int(hash_digest[:8], 16) / 0xffffffff
-        
-        # Convert HSV to RGB
-        rgb = colorsys.hsv_to_rgb(hue, saturation, value)
-        
-        # Convert RGB from 0-1 range to 0-255 range and format as hexadecimal
-        rgb_255 = tuple(int(component * 255) for component in rgb)
-        hex_color = '#%02x%02x%02x' % rgb_255
-        # Strip the '#' character and convert the string to RGB integers
-        rgb = tuple(int(hex_color.strip('#')[i:i+2], 16) for i in (0, 2, 4))
-        
-        # Convert RGB to BGR for OpenCV
-        bgr = rgb[::-1]
-        
-        return bgr
+        # key on the string form, as the hash does, so 3 and 3.0 keep their distinct colors
+        return _hashed_bgr(str(id), saturation, value)
 
     def plot_box_on_img(self, img: np.ndarray, box: tuple, conf: float, cls: int, id: int, thickness: int = 2, fontscale: float = 0.5) -> np.ndarray:
         """
@@ -253,6 +359,9 @@ class BaseTracker(ABC):
         Returns:
         - np.ndarray: The image array with the bounding box drawn on it.
         """
+        # one color lookup and one text origin per box, shared by the outline and label draws
+        color = self.id_to_color(id)
+        org = (int(box[0]), int(box[1]) - 10)
         if self.is_obb:
             
             angle = box[4] * 180.0 / np.pi  # Convert radians to degrees
@@ -262,35 +371,27 @@ class BaseTracker(ABC):
             box_poly = np.int_(rotrec)  # Convert to integer
 
             # Draw the rectangle on the image
-            img = cv.polylines(img, [box_poly], isClosed=True, color=self.id_to_color(id), thickness=thickness)
-
-            img = cv.putText(
-                img,
-                f'id: {int(id)}, conf: {conf:.2f}, c: {int(cls)}, a: {box[4]:.2f}',
-                (int(box[0]), int(box[1]) - 10),
-                cv.FONT_HERSHEY_SIMPLEX,
-                fontscale,
-                self.id_to_color(id),
-                thickness
-            )
+            img = cv.polylines(img, [box_poly], isClosed=True, color=color, thickness=thickness)
+            label = f'id: {int(id)}, conf: {conf:.2f}, c: {int(cls)}, a: {box[4]:.2f}'
         else :
 
             img = cv.rectangle(
                 img,
                 (int(box[0]), int(box[1])),
                 (int(box[2]), int(box[3])),
-                self.id_to_color(id),
-                thickness
-            )
-            img = cv.putText(
-                img,
-                f'id: {int(id)}, conf: {conf:.2f}, c: {int(cls)}',
-                (int(box[0]), int(box[1]) - 10),
-                cv.FONT_HERSHEY_SIMPLEX,
-                fontscale,
-                self.id_to_color(id),
+                color,
                 thickness
             )
+            label = f'id: {int(id)}, conf: {conf:.2f}, c: {int(cls)}'
+        img = cv.putText(
+            img,
+            label,
+            org,
+            cv.FONT_HERSHEY_SIMPLEX,
+            fontscale,
+            color,
+            thickness
+        )
         return img
 
 
@@ -309,26 +410,24 @@ class BaseTracker(ABC):
         Returns:
         - np.ndarray: The image array with the trajectories drawn on it.
         """
-        for i, box in enumerate(observations):
-            trajectory_thickness = int(np.sqrt(float (i + 1)) * 1.2)
-            if self.is_obb:
-                img = cv.circle(
-                    img,
-                    (int(box[0]), int(box[1])),
-                    2,
-                    color=self.id_to_color(int(id)),
-                    thickness=trajectory_thickness 
-                )
-            else:
-
-                img = cv.circle(
-                    img,
-                    (int((box[0] + box[2]) / 2),
-                    int((box[1] + box[3]) / 2)), 
-                    2,
-                    color=self.id_to_color(int(id)),
-                    thickness=trajectory_thickness
-                )
+        if len(observations) == 0:
+            return img
+        color = self.id_to_color(int(id))
+        boxes = np.asarray(observations)
+        # centers and thicknesses for the whole history at once; only the drawing loops
+        if self.is_obb:
+            centers = boxes[:, :2].astype(int)
+        else:
+            centers = ((boxes[:, 0:2] + boxes[:, 2:4]) / 2).astype(int)
+        thicknesses = (np.sqrt(np.arange(1, len(boxes) + 1, dtype=float)) * 1.2).astype(int)
+        for (cx, cy), trajectory_thickness in zip(centers.tolist(), thicknesses.tolist()):
+            img = cv.circle(
+                img,
+                (cx, cy),
+                2,
+                color=color,
+                thickness=trajectory_thickness
+            )
         return img
 
 
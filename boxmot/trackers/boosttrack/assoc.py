@@ -5,6 +5,8 @@ from typing import Optional
 import lap
 import numpy as np
 
+from boxmot.utils.association import split_matches
+
 
 def shape_similarity(detects: np.ndarray, tracks: np.ndarray, s_sim_corr: bool) -> np.ndarray:
     if not s_sim_corr:
@@ -118,8 +120,9 @@ def match(cost_matrix: np.ndarray, threshold: float) -> np.ndarray:
         if a.sum(1).max() == 1 and a.sum(0).max() == 1:
             matched_indices = np.stack(np.where(a), axis=1)
         else:
-            _, x, y = lap.lapjv(-cost_matrix, extend_cost=True)
-            matched_indices = np.array([[y[i], i] for i in x if i >= 0])
+            _, x, _ = lap.lapjv(-cost_matrix, extend_cost=True)
+            rows = np.flatnonzero(x >= 0)  # (row, x[row]) pairs in row order
+            matched_indices = np.column_stack((rows, x[rows]))
     else:
         matched_indices = np.empty(shape=(0, 2))
     return matched_indices
@@ -134,32 +137,15 @@ def linear_assignment(detections: np.ndarray, trackers: np.ndarray,
         iou_matrix = deepcopy(cost_matrix)
     if cost_matrix is None:
         cost_matrix = deepcopy(iou_matrix)
-    matched_indices = match(cost_matrix, threshold)
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if d not in matched_indices[:, 0]:
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if t not in matched_indices[:, 1]:
-            unmatched_trackers.append(t)
+    matched_indices = np.asarray(match(cost_matrix, threshold), dtype=int).reshape(-1, 2)
 
     # filter out matched with low IOU
-    matches = []
-    for m in matched_indices:
-        valid_match = iou_matrix[m[0], m[1]] >= threshold  or (False if emb_cost is None else (iou_matrix[m[0], m[1]] >= threshold / 2 and emb_cost[m[0], m[1]] >= 0.75))
-        if valid_match:
-            matches.append(m.reshape(1, 2))
-        else:
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-
-    if len(matches) == 0:
-        matches = np.empty((0, 2), dtype=int)
-    else:
-        matches = np.concatenate(matches, axis=0)
+    d, t = matched_indices[:, 0], matched_indices[:, 1]
+    valid_match = iou_matrix[d, t] >= threshold
+    if emb_cost is not None:
+        valid_match |= (iou_matrix[d, t] >= threshold / 2) & (emb_cost[d, t] >= 0.75)
 
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers), cost_matrix
+    return (*split_matches(matched_indices, len(detections), len(trackers), ~valid_match), cost_matrix)
 
 
 def associate(
@@ -184,13 +170,13 @@ def associate(
         )
     iou_matrix = iou_batch(detections, trackers)
 
-    cost_matrix = deepcopy(iou_matrix)
+    cost_matrix = iou_matrix.copy()
 
     if detection_confidence is not None and track_confidence is not None:
         conf = np.multiply(detection_confidence.reshape((-1, 1)), track_confidence.reshape((1, -1)))
         conf[iou_matrix < iou_threshold] = 0
 
-        cost_matrix += lambda_iou * conf * iou_batch(detections, trackers)
+        cost_matrix += lambda_iou * conf * iou_matrix
     else:
         warnings.warn("Detections or tracklet confidence is None and detection-tracklet confidence cannot be computed!")
         conf = None
@@ -81,8 +81,7 @@ class KalmanBoxTracker:
 
     def camera_update(self, transform: np.ndarray):
         x1, y1, x2, y2 = self.get_state()[0]
-        x1_, y1_, _ = transform @ np.array([x1, y1, 1]).T
-        x2_, y2_, _ = transform @ np.array([x2, y2, 1]).T
+        (x1_, y1_), (x2_, y2_) = np.array([[x1, y1, 1], [x2, y2, 1]]) @ transform[:2].T
         w, h = x2_ - x1_, y2_ - y1_
         cx, cy = x1_ + w / 2, y1_ + h / 2
         self.kf.x[:4] = [cx, cy, h, w / h]
@@ -99,7 +98,10 @@ class KalmanBoxTracker:
         return self.x_to_bbox_func(self.kf.x)
 
     def update_emb(self, emb, alpha=0.9):
-        self.emb = alpha * self.emb + (1 - alpha) * emb
+        # EMA and renormalization in place; `emb` rows come from per-frame arrays,
+        # so the buffer is owned by this track
+        self.emb *= alpha
+        self.emb += (1 - alpha) * emb
         self.emb /= np.linalg.norm(self.emb)
 
     def get_emb(self):
@@ -211,16 +213,21 @@ class BoostTrack(BaseTracker):
             trks.append(np.concatenate([pos, [conf]]))
         trks_np = np.vstack(trks) if len(trks) > 0 else np.empty((0, 5))
 
+        # the boosts only rewrite confidences, so the Mahalanobis distances of the boxes
+        # are computed once per frame and shared with the association below
+        mh_dist_matrix = self.get_mh_dist_matrix(dets)
         if self.use_dlo_boost:
-            dets = self.dlo_confidence_boost(dets)
+            dets = self.dlo_confidence_boost(dets, mh_dist_matrix)
         if self.use_duo_boost:
-            dets = self.duo_confidence_boost(dets)
+            dets = self.duo_confidence_boost(dets, mh_dist_matrix)
 
         dets_embs = np.ones((dets.shape[0], 1))
         if dets.size > 0:
             remain_inds = dets[:, 4] >= self.det_thresh
             dets = dets[remain_inds]
             scores = dets[:, 4]
+            if mh_dist_matrix.size > 0:
+                mh_dist_matrix = mh_dist_matrix[remain_inds]
 
             if self.with_reid:
                 if embs is not None:
@@ -241,8 +248,6 @@ class BoostTrack(BaseTracker):
         else:
             emb_cost = None
 
-        mh_dist_matrix = self.get_mh_dist_matrix(dets)
-
         matched, unmatched_dets, unmatched_trks, _ = associate(
             dets,
             trks_np,
@@ -326,13 +331,14 @@ class BoostTrack(BaseTracker):
         return ((z.reshape((-1, 1, n_dims)) - x.reshape((1, -1, n_dims))) ** 2 *
                 sigma_inv.reshape((1, -1, n_dims))).sum(axis=2)
 
-    def duo_confidence_boost(self, detections: np.ndarray) -> np.ndarray:
+    def duo_confidence_boost(self, detections: np.ndarray, mh_dist: Optional[np.ndarray] = None) -> np.ndarray:
         if len(detections) == 0:
             return detections
 
         n_dims = 4
         limit = 13.2767
-        mh_dist = self.get_mh_dist_matrix(detections, n_dims)
+        if mh_dist is None:
+            mh_dist = self.get_mh_dist_matrix(detections, n_dims)
         if mh_dist.size > 0 and self.frame_count > 1:
             min_dists = mh_dist.min(1)
             mask = (min_dists > limit) & (detections[:, 4] < self.det_thresh)
@@ -342,20 +348,20 @@ class BoostTrack(BaseTracker):
                 bdiou = iou_batch(detections[boost_inds], detections[boost_inds]) - np.eye(len(boost_inds))
                 bdiou_max = bdiou.max(axis=1)
                 remaining = boost_inds[bdiou_max <= iou_limit]
-                args = np.where(bdiou_max > iou_limit)[0]
-                for i in range(len(args)):
-                    bi = args[i]
-                    tmp = np.where(bdiou[bi] > iou_limit)[0]
-                    args_tmp = np.append(np.intersect1d(boost_inds[args], boost_inds[tmp]), boost_inds[bi])
-                    conf_max = np.max(detections[args_tmp, 4])
-                    if detections[boost_inds[bi], 4] == conf_max:
-                        remaining = np.concatenate([remaining, [boost_inds[bi]]])
+                # an overlapping candidate is kept only if it has the highest conf among
+                # itself and its overlapping candidates that themselves overlap something
+                overlapping = bdiou_max > iou_limit
+                confs = detections[boost_inds, 4]
+                neighbours = (bdiou > iou_limit) & overlapping[None, :]
+                neighbour_max = np.where(neighbours, confs[None, :], -np.inf).max(axis=1)
+                winners = overlapping & (confs >= neighbour_max)
+                remaining = np.concatenate([remaining, boost_inds[winners]])
                 mask_boost = np.zeros_like(detections[:, 4], dtype=bool)
                 mask_boost[remaining] = True
                 detections[:, 4] = np.where(mask_boost, self.det_thresh + 1e-4, detections[:, 4])
         return detections
 
-    def dlo_confidence_boost(self, detections: np.ndarray) -> np.ndarray:
+    def dlo_confidence_boost(self, detections: np.ndarray, mh_dist: Optional[np.ndarray] = None) -> np.ndarray:
         if len(detections) == 0:
             return detections
         
@@ -369,7 +375,9 @@ class BoostTrack(BaseTracker):
             trackers[t] = [pos[0], pos[1], pos[2], pos[3], 0, trk.time_since_update - 1]
 
         if self.use_rich_s:
-            mhd_sim = MhDist_similarity(self.get_mh_dist_matrix(detections), 1)
+            if mh_dist is None:
+                mh_dist = self.get_mh_dist_matrix(detections)
+            mhd_sim = MhDist_similarity(mh_dist, 1)
             shape_sim = shape_similarity(detections, trackers, self.s_sim_corr)
             S = (mhd_sim + shape_sim + sbiou_matrix) / 3
         else:
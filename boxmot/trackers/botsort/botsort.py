@@ -2,6 +2,7 @@
 
 import torch
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from boxmot.motion.kalman_filters.aabb.xywh_kf import KalmanFilterXYWH
@@ -37,6 +38,7 @@ class BotSort(BaseTracker):
         frame_rate (int, optional): Video frame rate, used to scale the track buffer.
         fuse_first_associate (bool, optional): Fuse appearance and motion in the first association step.
         with_reid (bool, optional): Use ReID features for association.
+        emb_precision (str, optional): Precision of the appearance distance, "fp32", "fp16" or "int8".
     """
 
     def __init__(
@@ -56,10 +58,12 @@ class BotSort(BaseTracker):
         frame_rate=30,
         fuse_first_associate: bool = False,
         with_reid: bool = True,
+        emb_precision: str = "fp32",
     ):
         super().__init__(per_class=per_class)
         self.lost_stracks = []  # type: list[STrack]
         self.removed_stracks = []  # type: list[STrack]
+        self._removed_ids = set()  # ids of `removed_stracks`, kept in step with it
         BaseTrack.clear_count()
 
         self.per_class = per_class
@@ -76,6 +80,10 @@ class BotSort(BaseTracker):
         self.proximity_thresh = proximity_thresh
         self.appearance_thresh = appearance_thresh
         self.with_reid = with_reid
+        self.emb_precision = emb_precision
+        # camera motion is estimated on this worker while the ReID model runs;
+        # created on first use, see `_get_cmc_worker`
+        self._cmc_worker = None
         if self.with_reid:
             self.model = ReidAutoBackend(
                 weights=reid_weights, device=device, half=half
@@ -84,6 +92,27 @@ class BotSort(BaseTracker):
         self.cmc = get_cmc_method(cmc_method)()
         self.fuse_first_associate = fuse_first_associate
 
+    def _get_cmc_worker(self) -> ThreadPoolExecutor:
+        if self._cmc_worker is None:
+            self._cmc_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="botsort-cmc")
+        return self._cmc_worker
+
+    def close(self):
+        """Shut down the camera motion worker thread, if one was started."""
+        worker = getattr(self, "_cmc_worker", None)
+        if worker is not None:
+            worker.shutdown(wait=False)
+            self._cmc_worker = None
+
+    def __del__(self):
+        self.close()
+
+    def __getstate__(self):
+        # executors hold threads and locks; a copy starts its own on first use
+        state = self.__dict__.copy()
+        state["_cmc_worker"] = None
+        return state
+
     @BaseTracker.setup_decorator
     @BaseTracker.per_class_decorator
     def update(self, dets: np.ndarray, img: np.ndarray, embs: np.ndarray = None) -> np.ndarray:
@@ -95,11 +124,15 @@ class BotSort(BaseTracker):
         # Preprocess detections
         dets, dets_first, embs_first, dets_second = self._split_detections(dets, embs)
 
-        # Extract appearance features
+        # Extract appearance features, overlapped with the camera motion estimate;
+        # both only read `img` and release the GIL in their native kernels
         if self.with_reid and embs is None:
+            warp = self._get_cmc_worker().submit(self.cmc.apply, img, dets)
             features_high = self.model.get_features(dets_first[:, 0:4], img)
+            warp = warp.result()
         else:
             features_high = embs_first if embs_first is not None else []
+            warp = self.cmc.apply(img, dets)
 
         # Create detections
         detections = self._create_detections(dets_first, features_high)
@@ -110,16 +143,17 @@ class BotSort(BaseTracker):
         strack_pool = joint_stracks(active_tracks, self.lost_stracks)
 
         # First association
-        matches_first, u_track_first, u_detection_first = self._first_association(dets, dets_first, active_tracks, unconfirmed, img, detections, activated_stracks, refind_stracks, strack_pool)
+        matches_first, u_track_first, u_detection_first = self._first_association(warp, unconfirmed, detections, activated_stracks, refind_stracks, strack_pool)
 
         # Second association
         matches_second, u_track_second, u_detection_second = self._second_association(dets_second, activated_stracks, lost_stracks, refind_stracks, u_track_first, strack_pool)
 
-        # Handle unconfirmed tracks
-        matches_unc, u_track_unc, u_detection_unc = self._handle_unconfirmed_tracks(u_detection_first, detections, activated_stracks, removed_stracks, unconfirmed)
+        # Handle unconfirmed tracks, against the detections left over from the first association
+        detections_left = [detections[i] for i in u_detection_first]
+        matches_unc, u_track_unc, u_detection_unc = self._handle_unconfirmed_tracks(detections_left, activated_stracks, removed_stracks, unconfirmed)
 
         # Initialize new tracks
-        self._initialize_new_tracks(u_detection_unc, activated_stracks, [detections[i] for i in u_detection_first])
+        self._initialize_new_tracks(u_detection_unc, activated_stracks, detections_left)
 
         # Update lost and removed tracks
         self._update_track_states(lost_stracks, removed_stracks)
@@ -128,19 +162,22 @@ class BotSort(BaseTracker):
         return self._prepare_output(activated_stracks, refind_stracks, lost_stracks, removed_stracks)
 
     def _split_detections(self, dets, embs):
-        dets = np.hstack([dets, np.arange(len(dets)).reshape(-1, 1)])
+        dets = self.append_det_indices(dets)
         confs = dets[:, 4]
-        second_mask = np.logical_and(confs > self.track_low_thresh, confs < self.track_high_thresh)
-        dets_second = dets[second_mask]
         first_mask = confs > self.track_high_thresh
+        second_mask = (confs > self.track_low_thresh) & (confs < self.track_high_thresh)
         dets_first = dets[first_mask]
+        dets_second = dets[second_mask]
         embs_first = embs[first_mask] if embs is not None else None
         return dets, dets_first, embs_first, dets_second
 
     def _create_detections(self, dets_first, features_high):
         if len(dets_first) > 0:
             if self.with_reid:
-                detections = [STrack(det, f, max_obs=self.max_obs) for (det, f) in zip(dets_first, features_high)]
+                # normalize all appearance features in one pass instead of once per STrack
+                features_high = np.asarray(features_high)
+                features_high = features_high / np.maximum(np.linalg.norm(features_high, axis=1, keepdims=True), 1e-12)
+                detections = [STrack(det, f, max_obs=self.max_obs, feat_normalized=True) for (det, f) in zip(dets_first, features_high)]
             else:
                 detections = [STrack(det, max_obs=self.max_obs) for det in dets_first]
         else:
@@ -156,13 +193,24 @@ class BotSort(BaseTracker):
                 active_tracks.append(track)
         return unconfirmed, active_tracks
 
-    def _first_association(self, dets, dets_first, active_tracks, unconfirmed, img, detections, activated_stracks, refind_stracks, strack_pool):
+    def _fuse_appearance(self, tracks, detections, ious_dists, ious_dists_mask):
+        """Take the minimum of the IoU cost and the appearance cost, where the latter is
+        halved and set to 1.0 beyond `appearance_thresh` or outside the IoU proximity gate."""
+        emb_dists = embedding_distance(
+            tracks, detections, gate=~ious_dists_mask, normalized=True,
+            half=self.emb_precision == "fp16", quantize=self.emb_precision == "int8",
+        )
+        emb_dists /= 2.0
+        # gate and reduce in place, reusing the appearance cost buffer
+        gated = emb_dists > self.appearance_thresh
+        gated |= ious_dists_mask
+        emb_dists[gated] = 1.0
+        return np.minimum(ious_dists, emb_dists, out=emb_dists)
+
+    def _first_association(self, warp, unconfirmed, detections, activated_stracks, refind_stracks, strack_pool):
         
-        STrack.multi_predict(strack_pool)
-
-        # Fix camera motion
-        warp = self.cmc.apply(img, dets)
-        STrack.multi_gmc(strack_pool, warp)
+        # Predict and fix camera motion in one pass over the pooled states
+        STrack.multi_predict(strack_pool, warp)
         STrack.multi_gmc(unconfirmed, warp)
 
         # Associate with high confidence detection boxes
@@ -172,24 +220,12 @@ class BotSort(BaseTracker):
             ious_dists = fuse_score(ious_dists, detections)
 
         if self.with_reid:
-            emb_dists = embedding_distance(strack_pool, detections) / 2.0
-            emb_dists[emb_dists > self.appearance_thresh] = 1.0
-            emb_dists[ious_dists_mask] = 1.0
-            dists = np.minimum(ious_dists, emb_dists)
+            dists = self._fuse_appearance(strack_pool, detections, ious_dists, ious_dists_mask)
         else:
             dists = ious_dists
 
         matches, u_track, u_detection = linear_assignment(dists, thresh=self.match_thresh)
-                
-        for itracked, idet in matches:
-            track = strack_pool[itracked]
-            det = detections[idet]
-            if track.state == TrackState.Tracked:
-                track.update(detections[idet], self.frame_count)
-                activated_stracks.append(track)
-            else:
-                track.re_activate(det, self.frame_count, new_id=False)
-                refind_stracks.append(track)
+        self._update_tracks(matches, strack_pool, detections, activated_stracks, refind_stracks)
                 
         return matches, u_track, u_detection
 
@@ -207,16 +243,7 @@ class BotSort(BaseTracker):
 
         dists = iou_distance(r_tracked_stracks, detections_second)
         matches, u_track, u_detection = linear_assignment(dists, thresh=0.5)
-        
-        for itracked, idet in matches:
-            track = r_tracked_stracks[itracked]
-            det = detections_second[idet]
-            if track.state == TrackState.Tracked:
-                track.update(det, self.frame_count)
-                activated_stracks.append(track)
-            else:
-                track.re_activate(det, self.frame_count, new_id=False)
-                refind_stracks.append(track)
+        self._update_tracks(matches, r_tracked_stracks, detections_second, activated_stracks, refind_stracks)
 
         for it in u_track:
             track = r_tracked_stracks[it]
@@ -227,19 +254,15 @@ class BotSort(BaseTracker):
         return matches, u_track, u_detection
 
 
-    def _handle_unconfirmed_tracks(self, u_detection, detections, activated_stracks, removed_stracks, unconfirmed):
+    def _handle_unconfirmed_tracks(self, detections, activated_stracks, removed_stracks, unconfirmed):
         """
         Handle unconfirmed tracks (tracks with only one detection frame).
 
         Args:
-            u_detection: Unconfirmed detection indices.
-            detections: Current list of detections.
+            detections: Detections left unmatched by the first association.
             activated_stracks: List of newly activated tracks.
             removed_stracks: List of tracks to remove.
         """
-        # Only use detections that are unconfirmed (filtered by u_detection)
-        detections = [detections[i] for i in u_detection]
-        
         # Calculate IoU distance between unconfirmed tracks and detections
         ious_dists = iou_distance(unconfirmed, detections)
         
@@ -249,10 +272,7 @@ class BotSort(BaseTracker):
         
         # Fuse scores for IoU-based and embedding-based matching (if applicable)
         if self.with_reid:
-            emb_dists = embedding_distance(unconfirmed, detections) / 2.0
-            emb_dists[emb_dists > self.appearance_thresh] = 1.0
-            emb_dists[ious_dists_mask] = 1.0  # Apply the IoU mask to embedding distances
-            dists = np.minimum(ious_dists, emb_dists)
+            dists = self._fuse_appearance(unconfirmed, detections, ious_dists, ious_dists_mask)
         else:
             dists = ious_dists
 
@@ -273,31 +293,29 @@ class BotSort(BaseTracker):
         return matches, u_unconfirmed, u_detection
 
     def _initialize_new_tracks(self, u_detections, activated_stracks, detections):
-        for inew in u_detections:
-            track = detections[inew]
-            if track.conf < self.new_track_thresh:
-                continue
-
-            track.activate(self.kalman_filter, self.frame_count)
+        new_tracks = [detections[inew] for inew in u_detections if detections[inew].conf >= self.new_track_thresh]
+        for track, state in zip(new_tracks, STrack.multi_initiate(new_tracks, self.kalman_filter)):
+            track.activate(self.kalman_filter, self.frame_count, state)
             activated_stracks.append(track)
 
     def _update_tracks(self, matches, strack_pool, detections, activated_stracks, refind_stracks, mark_removed=False):
-        # Update or reactivate matched tracks
-        for itracked, idet in matches:
-            track = strack_pool[itracked]
-            det = detections[idet]
+        # Update or reactivate matched tracks, with one batched Kalman correction for all of them
+        tracks = [strack_pool[i] for i in matches[:, 0]]
+        dets = [detections[i] for i in matches[:, 1]]
+        for track, det, state in zip(tracks, dets, STrack.multi_update(tracks, dets)):
             if track.state == TrackState.Tracked:
-                track.update(det, self.frame_count)
+                track.update(det, self.frame_count, state=state)
                 activated_stracks.append(track)
             else:
-                track.re_activate(det, self.frame_count, new_id=False)
+                track.re_activate(det, self.frame_count, new_id=False, state=state)
                 refind_stracks.append(track)
         
         # Mark only unmatched tracks as removed, if mark_removed flag is True
         if mark_removed:
-            unmatched_tracks = [strack_pool[i] for i in range(len(strack_pool)) if i not in [m[0] for m in matches]]
-            for track in unmatched_tracks:
-                track.mark_removed()
+            unmatched = np.ones(len(strack_pool), dtype=bool)
+            unmatched[matches[:, 0]] = False
+            for i in np.flatnonzero(unmatched):
+                strack_pool[i].mark_removed()
 
     def _update_track_states(self, lost_stracks, removed_stracks):
         for track in self.lost_stracks:
@@ -313,8 +331,9 @@ class BotSort(BaseTracker):
         self.active_tracks = joint_stracks(self.active_tracks, refind_stracks)
         self.lost_stracks = sub_stracks(self.lost_stracks, self.active_tracks)
         self.lost_stracks.extend(lost_stracks)
-        self.lost_stracks = sub_stracks(self.lost_stracks, self.removed_stracks)
+        self.lost_stracks = [t for t in self.lost_stracks if t.id not in self._removed_ids]
         self.removed_stracks.extend(removed_stracks)
+        self._removed_ids.update(t.id for t in removed_stracks)
         self.active_tracks, self.lost_stracks = remove_duplicate_stracks(
             self.active_tracks, self.lost_stracks
         )
@@ -9,7 +9,7 @@ from boxmot.utils.ops import xywh2xyxy, xyxy2xywh
 class STrack(BaseTrack):
     shared_kalman = KalmanFilterXYWH()
 
-    def __init__(self, det, feat=None, feat_history=50, max_obs=50):
+    def __init__(self, det, feat=None, feat_history=50, max_obs=50, feat_normalized=False):
         # Initialize detection parameters
         self.xywh = xyxy2xywh(det[:4])  # Convert to (xc, yc, w, h)
         self.conf = det[4]
@@ -24,7 +24,7 @@ class STrack(BaseTrack):
         self.tracklet_len = 0
 
         # Classification history and feature history
-        self.cls_hist = []
+        self.cls_hist = {}  # cls id -> accumulated conf
         self.history_observations = deque(maxlen=self.max_obs)
         self.features = deque(maxlen=feat_history)
         self.smooth_feat = None
@@ -34,32 +34,29 @@ class STrack(BaseTrack):
         # Update initial class and features
         self.update_cls(self.cls, self.conf)
         if feat is not None:
-            self.update_features(feat)
+            self.update_features(feat, normalized=feat_normalized)
 
-    def update_features(self, feat):
-        """Normalize and update feature vectors."""
-        feat /= np.linalg.norm(feat)
+    def update_features(self, feat, normalized=False):
+        """Normalize (unless `normalized`) and update feature vectors."""
+        if not normalized:
+            feat /= np.sqrt(feat @ feat)
         self.curr_feat = feat
         if self.smooth_feat is None:
-            self.smooth_feat = feat
+            self.smooth_feat = feat.copy()
         else:
-            self.smooth_feat = self.alpha * self.smooth_feat + (1 - self.alpha) * feat
-        self.smooth_feat /= np.linalg.norm(self.smooth_feat)
+            # EMA and renormalization in place on the track-owned buffer
+            self.smooth_feat *= self.alpha
+            self.smooth_feat += (1 - self.alpha) * feat
+            self.smooth_feat /= np.sqrt(self.smooth_feat @ self.smooth_feat)
         self.features.append(feat)
 
     def update_cls(self, cls, conf):
         """Update class history based on detection confidence."""
-        max_freq = 0
-        found = False
-        for c in self.cls_hist:
-            if cls == c[0]:
-                c[1] += conf
-                found = True
-            if c[1] > max_freq:
-                max_freq = c[1]
-                self.cls = c[0]
-        if not found:
-            self.cls_hist.append([cls, conf])
+        if cls in self.cls_hist:
+            self.cls_hist[cls] += conf
+            self.cls = max(self.cls_hist, key=self.cls_hist.get)
+        else:
+            self.cls_hist[cls] = conf
             self.cls = cls
 
     def predict(self):
@@ -70,39 +67,77 @@ class STrack(BaseTrack):
         self.mean, self.covariance = self.kalman_filter.predict(mean_state, self.covariance)
 
     @staticmethod
-    def multi_predict(stracks):
-        """Perform batch prediction for multiple tracks."""
+    def multi_predict(stracks, H=None):
+        """Perform batch prediction for multiple tracks, followed by the camera
+        motion compensation `H` if given (same as a subsequent `multi_gmc`)."""
         if not stracks:
             return
-        multi_mean = np.asarray([st.mean.copy() for st in stracks])
-        multi_covariance = np.asarray([st.covariance for st in stracks])
-        for i, st in enumerate(stracks):
-            if st.state != TrackState.Tracked:
-                multi_mean[i][6:8] = 0  # Reset velocities
+        multi_mean = np.stack([st.mean for st in stracks])
+        multi_covariance = np.stack([st.covariance for st in stracks])
+        tracked = np.fromiter((st.state == TrackState.Tracked for st in stracks), dtype=bool, count=len(stracks))
+        multi_mean[:, 6:8] *= tracked[:, None]  # Reset velocities of non-tracked tracks
         multi_mean, multi_covariance = STrack.shared_kalman.multi_predict(multi_mean, multi_covariance)
-        for st, mean, cov in zip(stracks, multi_mean, multi_covariance):
-            st.mean, st.covariance = mean, cov
+        if H is not None:
+            multi_mean, multi_covariance = STrack._warp_states(multi_mean, multi_covariance, H)
+        STrack._set_states(stracks, multi_mean, multi_covariance)
 
     @staticmethod
     def multi_gmc(stracks, H=np.eye(2, 3)):
         """Apply geometric motion compensation to multiple tracks."""
         if not stracks:
             return
+        multi_mean, multi_covariance = STrack._warp_states(
+            np.stack([st.mean for st in stracks]), np.stack([st.covariance for st in stracks]), H
+        )
+        STrack._set_states(stracks, multi_mean, multi_covariance)
+
+    @staticmethod
+    def multi_update(stracks, detections):
+        """Run the Kalman correction of every (track, detection) pair in one batch and
+        return the new (mean, covariance) per track, to be passed to `update` / `re_activate`."""
+        if not stracks:
+            return []
+        multi_mean, multi_covariance = STrack.shared_kalman.multi_update(
+            np.stack([st.mean for st in stracks]),
+            np.stack([st.covariance for st in stracks]),
+            np.stack([det.xywh for det in detections]),
+        )
+        return list(zip(multi_mean, multi_covariance))
+
+    @staticmethod
+    def multi_initiate(stracks, kalman_filter):
+        """Initiate the Kalman states of all new tracks in one batch and return the
+        (mean, covariance) per track, to be passed to `activate`."""
+        if not stracks:
+            return []
+        multi_mean, multi_covariance = kalman_filter.multi_initiate(np.stack([st.xywh for st in stracks]))
+        return list(zip(multi_mean, multi_covariance))
+
+    @staticmethod
+    def _warp_states(multi_mean, multi_covariance, H):
+        """Warp all states by the affine `H` in one batched matmul instead of per track."""
         R = H[:2, :2]
         R8x8 = np.kron(np.eye(4), R)
         t = H[:2, 2]
 
-        for st in stracks:
-            mean = R8x8.dot(st.mean)
-            mean[:2] += t
-            st.mean = mean
-            st.covariance = R8x8.dot(st.covariance).dot(R8x8.T)
+        multi_mean = multi_mean @ R8x8.T
+        multi_mean[:, :2] += t
+        multi_covariance = R8x8 @ multi_covariance @ R8x8.T
+        return multi_mean, multi_covariance
+
+    @staticmethod
+    def _set_states(stracks, multi_mean, multi_covariance):
+        """Write batched states back, filling each track's `xyxy` cache from one conversion."""
+        multi_xyxy = xywh2xyxy(multi_mean[:, :4])
+        for st, mean, cov, xyxy in zip(stracks, multi_mean, multi_covariance, multi_xyxy):
+            st.mean, st.covariance = mean, cov
+            st._xyxy = xyxy
 
-    def activate(self, kalman_filter, frame_id):
-        """Activate a new track."""
+    def activate(self, kalman_filter, frame_id, state=None):
+        """Activate a new track. `state` is its batched KF initiation, if computed."""
         self.kalman_filter = kalman_filter
         self.id = self.next_id()
-        self.mean, self.covariance = self.kalman_filter.initiate(self.xywh)
+        self.mean, self.covariance = state if state is not None else self.kalman_filter.initiate(self.xywh)
         self.tracklet_len = 0
         self.state = TrackState.Tracked
         if frame_id == 1:
@@ -110,11 +145,12 @@ class STrack(BaseTrack):
         self.frame_id = frame_id
         self.start_frame = frame_id
 
-    def re_activate(self, new_track, frame_id, new_id=False):
-        """Re-activate a track with a new detection."""
-        self.mean, self.covariance = self.kalman_filter.update(self.mean, self.covariance, new_track.xywh)
+    def re_activate(self, new_track, frame_id, new_id=False, state=None):
+        """Re-activate a track with a new detection. `state` is its batched KF correction, if computed."""
+        self.mean, self.covariance = state if state is not None else \
+            self.kalman_filter.update(self.mean, self.covariance, new_track.xywh)
         if new_track.curr_feat is not None:
-            self.update_features(new_track.curr_feat)
+            self.update_features(new_track.curr_feat, normalized=True)
         self.tracklet_len = 0
         self.state = TrackState.Tracked
         self.is_activated = True
@@ -126,15 +162,16 @@ class STrack(BaseTrack):
         self.det_ind = new_track.det_ind
         self.update_cls(new_track.cls, new_track.conf)
 
-    def update(self, new_track, frame_id):
-        """Update the current track with a matched detection."""
+    def update(self, new_track, frame_id, state=None):
+        """Update the current track with a matched detection. `state` is its batched KF correction, if computed."""
         self.frame_id = frame_id
         self.tracklet_len += 1
         self.history_observations.append(self.xyxy)
 
-        self.mean, self.covariance = self.kalman_filter.update(self.mean, self.covariance, new_track.xywh)
+        self.mean, self.covariance = state if state is not None else \
+            self.kalman_filter.update(self.mean, self.covariance, new_track.xywh)
         if new_track.curr_feat is not None:
-            self.update_features(new_track.curr_feat)
+            self.update_features(new_track.curr_feat, normalized=True)
 
         self.state = TrackState.Tracked
         self.is_activated = True
@@ -143,8 +180,19 @@ class STrack(BaseTrack):
         self.det_ind = new_track.det_ind
         self.update_cls(new_track.cls, new_track.conf)
 
+    @property
+    def mean(self):
+        return self._mean
+
+    @mean.setter
+    def mean(self, mean):
+        self._mean = mean
+        self._xyxy = None  # invalidate the cached `xyxy`
+
     @property
     def xyxy(self):
-        """Convert bounding box format to `(min x, min y, max x, max y)`."""
-        ret = self.mean[:4].copy() if self.mean is not None else self.xywh.copy()
-        return xywh2xyxy(ret)
+        """Convert bounding box format to `(min x, min y, max x, max y)`, cached until `mean` changes."""
+        if self._xyxy is None:
+            ret = self.mean[:4].copy() if self.mean is not None else self.xywh.copy()
+            self._xyxy = xywh2xyxy(ret)
+        return self._xyxy
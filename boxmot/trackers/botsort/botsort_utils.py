@@ -16,15 +16,11 @@ def joint_stracks(tlista: List['STrack'], tlistb: List['STrack']) -> List['STrac
     Returns:
         List[STrack]: A combined list of tracks from both input lists, without duplicates.
     """
-    exists = {}
-    res = []
-    for t in tlista:
-        exists[t.id] = 1
-        res.append(t)
+    seen = {t.id for t in tlista}
+    res = list(tlista)
     for t in tlistb:
-        tid = t.id
-        if not exists.get(tid, 0):
-            exists[tid] = 1
+        if t.id not in seen:
+            seen.add(t.id)
             res.append(t)
     return res
 
@@ -40,12 +36,8 @@ def sub_stracks(tlista: List['STrack'], tlistb: List['STrack']) -> List['STrack'
     Returns:
         List[STTrack]: The remaining tracks after removal.
     """
-    stracks = {t.id: t for t in tlista}
-    for t in tlistb:
-        tid = t.id
-        if tid in stracks:
-            del stracks[tid]
-    return list(stracks.values())
+    ids_b = {t.id for t in tlistb}
+    return [t for t in tlista if t.id not in ids_b]
 
 
 def remove_duplicate_stracks(stracksa: List['STrack'], stracksb: List['STrack']) -> Tuple[List['STrack'], List['STrack']]:
@@ -60,18 +52,18 @@ def remove_duplicate_stracks(stracksa: List['STrack'], stracksb: List['STrack'])
         Tuple[List[STrack], List[STrack]]: The filtered track lists, with duplicates removed.
     """
     pdist = iou_distance(stracksa, stracksb)
-    pairs = np.where(pdist < 0.15)
-    dupa, dupb = [], []
-
-    for p, q in zip(*pairs):
-        timep = stracksa[p].frame_id - stracksa[p].start_frame
-        timeq = stracksb[q].frame_id - stracksb[q].start_frame
-        if timep > timeq:
-            dupb.append(q)
-        else:
-            dupa.append(p)
-
-    resa = [t for i, t in enumerate(stracksa) if i not in dupa]
-    resb = [t for i, t in enumerate(stracksb) if i not in dupb]
+    p, q = np.nonzero(pdist < 0.15)
+    if len(p) == 0:
+        return list(stracksa), list(stracksb)
+    timea = np.array([t.frame_id - t.start_frame for t in stracksa])
+    timeb = np.array([t.frame_id - t.start_frame for t in stracksb])
+    # for each overlapping pair drop the younger track (ties drop the one from stracksa)
+    a_older = timea[p] > timeb[q]
+    keepa = np.ones(len(stracksa), dtype=bool)
+    keepb = np.ones(len(stracksb), dtype=bool)
+    keepa[p[~a_older]] = False
+    keepb[q[a_older]] = False
+    resa = [t for t, keep in zip(stracksa, keepa) if keep]
+    resb = [t for t, keep in zip(stracksb, keepb) if keep]
     
     return resa, resb
@@ -13,11 +13,14 @@ from boxmot.trackers.basetracker import BaseTracker
 class STrack(BaseTrack):
     shared_kalman = KalmanFilterXYAH()
 
-    def __init__(self, det, max_obs):
+    def __init__(self, det, max_obs, boxes=None):
         # wait activate
-        self.xywh = xyxy2xywh(det[0:4])  # (x1, y1, x2, y2) --> (xc, yc, w, h)
-        self.tlwh = xywh2tlwh(self.xywh)  # (xc, yc, w, h) --> (t, l, w, h)
-        self.xyah = tlwh2xyah(self.tlwh)
+        if boxes is None:
+            self.xywh = xyxy2xywh(det[0:4])  # (x1, y1, x2, y2) --> (xc, yc, w, h)
+            self.tlwh = xywh2tlwh(self.xywh)  # (xc, yc, w, h) --> (t, l, w, h)
+            self.xyah = tlwh2xyah(self.tlwh)
+        else:
+            self.xywh, self.tlwh, self.xyah = boxes  # precomputed by `from_dets`
         self.conf = det[4]
         self.cls = det[5]
         self.det_ind = det[6]
@@ -28,6 +31,14 @@ class STrack(BaseTrack):
         self.tracklet_len = 0
         self.history_observations = deque([], maxlen=self.max_obs)
 
+    @staticmethod
+    def from_dets(dets, max_obs):
+        """Create one STrack per detection row, converting the boxes of all rows at once."""
+        xywhs = xyxy2xywh(dets[:, 0:4])
+        tlwhs = xywh2tlwh(xywhs)
+        xyahs = tlwh2xyah(tlwhs)
+        return [STrack(det, max_obs, boxes) for det, *boxes in zip(dets, xywhs, tlwhs, xyahs)]
+
     def predict(self):
         mean_state = self.mean.copy()
         if self.state != TrackState.Tracked:
@@ -39,23 +50,51 @@ class STrack(BaseTrack):
     @staticmethod
     def multi_predict(stracks):
         if len(stracks) > 0:
-            multi_mean = np.asarray([st.mean.copy() for st in stracks])
-            multi_covariance = np.asarray([st.covariance for st in stracks])
-            for i, st in enumerate(stracks):
-                if st.state != TrackState.Tracked:
-                    multi_mean[i][7] = 0
+            multi_mean = np.stack([st.mean for st in stracks])
+            multi_covariance = np.stack([st.covariance for st in stracks])
+            tracked = np.fromiter(
+                (st.state == TrackState.Tracked for st in stracks), dtype=bool, count=len(stracks)
+            )
+            multi_mean[:, 7] *= tracked
             multi_mean, multi_covariance = STrack.shared_kalman.multi_predict(
                 multi_mean, multi_covariance
             )
-            for i, (mean, cov) in enumerate(zip(multi_mean, multi_covariance)):
-                stracks[i].mean = mean
-                stracks[i].covariance = cov
+            # fill the `xyxy` caches from one batched conversion
+            multi_xywh = multi_mean[:, :4].copy()
+            multi_xywh[:, 2] *= multi_xywh[:, 3]  # (xc, yc, a, h)  -->  (xc, yc, w, h)
+            multi_xyxy = xywh2xyxy(multi_xywh)
+            for st, mean, cov, xyxy in zip(stracks, multi_mean, multi_covariance, multi_xyxy):
+                st.mean = mean
+                st.covariance = cov
+                st._xyxy = xyxy
 
-    def activate(self, kalman_filter, frame_id):
-        """Start a new tracklet"""
+    @staticmethod
+    def multi_update(stracks, detections):
+        """Run the Kalman correction of every (track, detection) pair in one batch and
+        return the new (mean, covariance) per track, to be passed to `update` / `re_activate`."""
+        if len(stracks) == 0:
+            return []
+        multi_mean, multi_covariance = STrack.shared_kalman.multi_update(
+            np.stack([st.mean for st in stracks]),
+            np.stack([st.covariance for st in stracks]),
+            np.stack([det.xyah for det in detections]),
+        )
+        return list(zip(multi_mean, multi_covariance))
+
+    @staticmethod
+    def multi_initiate(stracks, kalman_filter):
+        """Initiate the Kalman states of all new tracks in one batch and return the
+        (mean, covariance) per track, to be passed to `activate`."""
+        if len(stracks) == 0:
+            return []
+        multi_mean, multi_covariance = kalman_filter.multi_initiate(np.stack([st.xyah for st in stracks]))
+        return list(zip(multi_mean, multi_covariance))
+
+    def activate(self, kalman_filter, frame_id, state=None):
+        """Start a new tracklet. `state` is its batched KF initiation, if computed."""
         self.kalman_filter = kalman_filter
         self.id = self.next_id()
-        self.mean, self.covariance = self.kalman_filter.initiate(self.xyah)
+        self.mean, self.covariance = state if state is not None else self.kalman_filter.initiate(self.xyah)
 
         self.tracklet_len = 0
         self.state = TrackState.Tracked
@@ -65,8 +104,8 @@ class STrack(BaseTrack):
         self.frame_id = frame_id
         self.start_frame = frame_id
 
-    def re_activate(self, new_track, frame_id, new_id=False):
-        self.mean, self.covariance = self.kalman_filter.update(
+    def re_activate(self, new_track, frame_id, new_id=False, state=None):
+        self.mean, self.covariance = state if state is not None else self.kalman_filter.update(
             self.mean, self.covariance, new_track.xyah
         )
         self.tracklet_len = 0
@@ -79,19 +118,19 @@ class STrack(BaseTrack):
         self.cls = new_track.cls
         self.det_ind = new_track.det_ind
 
-    def update(self, new_track, frame_id):
+    def update(self, new_track, frame_id, state=None):
         """
         Update a matched track
         :type new_track: STrack
         :type frame_id: int
-        :type update_feature: bool
+        :type state: (mean, covariance) from `multi_update`, if already computed
         :return:
         """
         self.frame_id = frame_id
         self.tracklet_len += 1
         self.history_observations.append(self.xyxy)
 
-        self.mean, self.covariance = self.kalman_filter.update(
+        self.mean, self.covariance = state if state is not None else self.kalman_filter.update(
             self.mean, self.covariance, new_track.xyah
         )
         self.state = TrackState.Tracked
@@ -101,18 +140,28 @@ class STrack(BaseTrack):
         self.cls = new_track.cls
         self.det_ind = new_track.det_ind
 
+    @property
+    def mean(self):
+        return self._mean
+
+    @mean.setter
+    def mean(self, mean):
+        self._mean = mean
+        self._xyxy = None  # invalidate the cached `xyxy`
+
     @property
     def xyxy(self):
         """Convert bounding box to format `(min x, min y, max x, max y)`, i.e.,
-        `(top left, bottom right)`.
+        `(top left, bottom right)`. Cached until `mean` changes.
         """
-        if self.mean is None:
-            ret = self.xywh.copy()  # (xc, yc, w, h)
-        else:
-            ret = self.mean[:4].copy()  # kf (xc, yc, a, h)
-            ret[2] *= ret[3]  # (xc, yc, a, h)  -->  (xc, yc, w, h)
-        ret = xywh2xyxy(ret)
-        return ret
+        if self._xyxy is None:
+            if self.mean is None:
+                ret = self.xywh.copy()  # (xc, yc, w, h)
+            else:
+                ret = self.mean[:4].copy()  # kf (xc, yc, a, h)
+                ret[2] *= ret[3]  # (xc, yc, a, h)  -->  (xc, yc, w, h)
+            self._xyxy = xywh2xyxy(ret)
+        return self._xyxy
 
 
 class ByteTrack(BaseTracker):
@@ -140,6 +189,7 @@ class ByteTrack(BaseTracker):
         self.active_tracks = []  # type: list[STrack]
         self.lost_stracks = []  # type: list[STrack]
         self.removed_stracks = []  # type: list[STrack]
+        self._removed_ids = set()  # ids of `removed_stracks`, kept in step with it
 
         self.frame_id = 0
         self.track_buffer = track_buffer
@@ -159,7 +209,7 @@ class ByteTrack(BaseTracker):
         
         self.check_inputs(dets, img)
 
-        dets = np.hstack([dets, np.arange(len(dets)).reshape(-1, 1)])
+        dets = self.append_det_indices(dets)
         self.frame_count += 1
         activated_starcks = []
         refind_stracks = []
@@ -178,9 +228,7 @@ class ByteTrack(BaseTracker):
 
         if len(dets) > 0:
             """Detections"""
-            detections = [
-                STrack(det, max_obs=self.max_obs) for det in dets
-            ]
+            detections = STrack.from_dets(dets, max_obs=self.max_obs)
         else:
             detections = []
 
@@ -204,21 +252,21 @@ class ByteTrack(BaseTracker):
             dists, thresh=self.match_thresh
         )
 
-        for itracked, idet in matches:
-            track = strack_pool[itracked]
-            det = detections[idet]
+        tracks = [strack_pool[i] for i in matches[:, 0]]
+        matched_dets = [detections[i] for i in matches[:, 1]]
+        for track, det, state in zip(tracks, matched_dets, STrack.multi_update(tracks, matched_dets)):
             if track.state == TrackState.Tracked:
-                track.update(detections[idet], self.frame_count)
+                track.update(det, self.frame_count, state=state)
                 activated_starcks.append(track)
             else:
-                track.re_activate(det, self.frame_count, new_id=False)
+                track.re_activate(det, self.frame_count, new_id=False, state=state)
                 refind_stracks.append(track)
 
         """ Step 3: Second association, with low conf detection boxes"""
         # association the untrack to the low conf detections
         if len(dets_second) > 0:
             """Detections"""
-            detections_second = [STrack(det_second, max_obs=self.max_obs) for det_second in dets_second]
+            detections_second = STrack.from_dets(dets_second, max_obs=self.max_obs)
         else:
             detections_second = []
         r_tracked_stracks = [
@@ -228,14 +276,14 @@ class ByteTrack(BaseTracker):
         ]
         dists = iou_distance(r_tracked_stracks, detections_second)
         matches, u_track, u_detection_second = linear_assignment(dists, thresh=0.5)
-        for itracked, idet in matches:
-            track = r_tracked_stracks[itracked]
-            det = detections_second[idet]
+        tracks = [r_tracked_stracks[i] for i in matches[:, 0]]
+        matched_dets = [detections_second[i] for i in matches[:, 1]]
+        for track, det, state in zip(tracks, matched_dets, STrack.multi_update(tracks, matched_dets)):
             if track.state == TrackState.Tracked:
-                track.update(det, self.frame_count)
+                track.update(det, self.frame_count, state=state)
                 activated_starcks.append(track)
             else:
-                track.re_activate(det, self.frame_count, new_id=False)
+                track.re_activate(det, self.frame_count, new_id=False, state=state)
                 refind_stracks.append(track)
 
         for it in u_track:
@@ -259,11 +307,9 @@ class ByteTrack(BaseTracker):
             removed_stracks.append(track)
 
         """ Step 4: Init new stracks"""
-        for inew in u_detection:
-            track = detections[inew]
-            if track.conf < self.det_thresh:
-                continue
-            track.activate(self.kalman_filter, self.frame_count)
+        new_tracks = [detections[inew] for inew in u_detection if detections[inew].conf >= self.det_thresh]
+        for track, state in zip(new_tracks, STrack.multi_initiate(new_tracks, self.kalman_filter)):
+            track.activate(self.kalman_filter, self.frame_count, state)
             activated_starcks.append(track)
         """ Step 5: Update state"""
         for track in self.lost_stracks:
@@ -278,65 +324,52 @@ class ByteTrack(BaseTracker):
         self.active_tracks = joint_stracks(self.active_tracks, refind_stracks)
         self.lost_stracks = sub_stracks(self.lost_stracks, self.active_tracks)
         self.lost_stracks.extend(lost_stracks)
-        self.lost_stracks = sub_stracks(self.lost_stracks, self.removed_stracks)
+        self.lost_stracks = [t for t in self.lost_stracks if t.id not in self._removed_ids]
         self.removed_stracks.extend(removed_stracks)
+        self._removed_ids.update(t.id for t in removed_stracks)
         self.active_tracks, self.lost_stracks = remove_duplicate_stracks(
             self.active_tracks, self.lost_stracks
         )
         # get confs of lost tracks
         output_stracks = [track for track in self.active_tracks if track.is_activated]
-        outputs = []
-        for t in output_stracks:
-            output = []
-            output.extend(t.xyxy)
-            output.append(t.id)
-            output.append(t.conf)
-            output.append(t.cls)
-            output.append(t.det_ind)
-            outputs.append(output)
-        outputs = np.asarray(outputs)
-        return outputs
+        outputs = [
+            [*t.xyxy, t.id, t.conf, t.cls, t.det_ind]
+            for t in output_stracks
+        ]
+        return np.asarray(outputs)
 
 
 # id, class_id, conf
 
 
 def joint_stracks(tlista, tlistb):
-    exists = {}
-    res = []
-    for t in tlista:
-        exists[t.id] = 1
-        res.append(t)
+    seen = {t.id for t in tlista}
+    res = list(tlista)
     for t in tlistb:
-        tid = t.id
-        if not exists.get(tid, 0):
-            exists[tid] = 1
+        if t.id not in seen:
+            seen.add(t.id)
             res.append(t)
     return res
 
 
 def sub_stracks(tlista, tlistb):
-    stracks = {}
-    for t in tlista:
-        stracks[t.id] = t
-    for t in tlistb:
-        tid = t.id
-        if stracks.get(tid, 0):
-            del stracks[tid]
-    return list(stracks.values())
+    ids_b = {t.id for t in tlistb}
+    return [t for t in tlista if t.id not in ids_b]
 
 
 def remove_duplicate_stracks(stracksa, stracksb):
     pdist = iou_distance(stracksa, stracksb)
-    pairs = np.where(pdist < 0.15)
-    dupa, dupb = list(), list()
-    for p, q in zip(*pairs):
-        timep = stracksa[p].frame_id - stracksa[p].start_frame
-        timeq = stracksb[q].frame_id - stracksb[q].start_frame
-        if timep > timeq:
-            dupb.append(q)
-        else:
-            dupa.append(p)
-    resa = [t for i, t in enumerate(stracksa) if i not in dupa]
-    resb = [t for i, t in enumerate(stracksb) if i not in dupb]
+    p, q = np.nonzero(pdist < 0.15)
+    if len(p) == 0:
+        return list(stracksa), list(stracksb)
+    timea = np.array([t.frame_id - t.start_frame for t in stracksa])
+    timeb = np.array([t.frame_id - t.start_frame for t in stracksb])
+    # for each overlapping pair drop the younger track (ties drop the one from stracksa)
+    a_older = timea[p] > timeb[q]
+    keepa = np.ones(len(stracksa), dtype=bool)
+    keepb = np.ones(len(stracksb), dtype=bool)
+    keepa[p[~a_older]] = False
+    keepb[q[a_older]] = False
+    resa = [t for t, keep in zip(stracksa, keepa) if keep]
+    resb = [t for t, keep in zip(stracksb, keepb) if keep]
     return resa, resb
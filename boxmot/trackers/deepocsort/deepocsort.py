@@ -8,7 +8,7 @@ from collections import deque
 from boxmot.appearance.reid.auto_backend import ReidAutoBackend
 from boxmot.motion.cmc import get_cmc_method
 from boxmot.motion.kalman_filters.aabb.xysr_kf import KalmanFilterXYSR
-from boxmot.utils.association import associate, linear_assignment
+from boxmot.utils.association import associate, linear_assignment, remove_indices
 from boxmot.trackers.basetracker import BaseTracker
 from boxmot.utils.ops import xyxy2xysr
 
@@ -168,7 +168,10 @@ class KalmanBoxTracker(object):
             self.frozen = True
 
     def update_emb(self, emb, alpha=0.9):
-        self.emb = alpha * self.emb + (1 - alpha) * emb
+        # EMA and renormalization in place; `emb` rows come from per-frame arrays,
+        # so the buffer is owned by this track
+        self.emb *= alpha
+        self.emb += (1 - alpha) * emb
         self.emb /= np.linalg.norm(self.emb)
 
     def get_emb(self):
@@ -317,7 +320,7 @@ class DeepOcSort(BaseTracker):
         self.height, self.width = img.shape[:2]
 
         scores = dets[:, 4]
-        dets = np.hstack([dets, np.arange(len(dets)).reshape(-1, 1)])
+        dets = self.append_det_indices(dets)
         assert dets.shape[1] == 7
         remain_inds = scores > self.det_thresh
         dets = dets[remain_inds]
@@ -427,8 +430,8 @@ class DeepOcSort(BaseTracker):
                     self.active_tracks[trk_ind].update_emb(dets_embs[det_ind], alpha=dets_alpha[det_ind])
                     to_remove_det_indices.append(det_ind)
                     to_remove_trk_indices.append(trk_ind)
-                unmatched_dets = np.setdiff1d(unmatched_dets, np.array(to_remove_det_indices))
-                unmatched_trks = np.setdiff1d(unmatched_trks, np.array(to_remove_trk_indices))
+                unmatched_dets = remove_indices(unmatched_dets, to_remove_det_indices)
+                unmatched_trks = remove_indices(unmatched_trks, to_remove_trk_indices)
 
         for m in unmatched_trks:
             self.active_tracks[m].update(None)
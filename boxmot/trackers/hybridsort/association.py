@@ -2,6 +2,9 @@
 
 import numpy as np
 
+from boxmot.utils import logger as LOGGER
+from boxmot.utils.association import split_matches
+
 
 def intersection_batch(bboxes1, bboxes2):
     bboxes2 = np.expand_dims(bboxes2, 0)
@@ -304,20 +307,19 @@ def linear_assignment(cost_matrix, thresh=0.):
             _, x, y = lap.lapjv(cost_matrix, extend_cost=True, cost_limit=thresh)
         else:
             _, x, y = lap.lapjv(cost_matrix, extend_cost=True)
-        return np.array([[y[i], i] for i in x if i >= 0])
+        rows = np.flatnonzero(x >= 0)  # (row, x[row]) pairs in row order
+        return np.column_stack((rows, x[rows]))
     except ImportError:
         from scipy.optimize import linear_sum_assignment
         x, y = linear_sum_assignment(cost_matrix)
-        return np.array(list(zip(x, y)))
+        return np.column_stack((x, y))
 
 
 def cost_vel(Y, X, trackers, velocities, detections, previous_obs, vdc_weight):
     # Y, X = speed_direction_batch(detections, previous_obs)
     inertia_Y, inertia_X = velocities[:, 0], velocities[:, 1]
-    inertia_Y = np.repeat(inertia_Y[:, np.newaxis], Y.shape[1], axis=1)
-    inertia_X = np.repeat(inertia_X[:, np.newaxis], X.shape[1], axis=1)
-    diff_angle_cos = inertia_X * X + inertia_Y * Y
-    diff_angle_cos = np.clip(diff_angle_cos, a_min=-1, a_max=1)
+    diff_angle_cos = inertia_X[:, np.newaxis] * X + inertia_Y[:, np.newaxis] * Y
+    np.clip(diff_angle_cos, -1, 1, out=diff_angle_cos)
     diff_angle = np.arccos(diff_angle_cos)
     diff_angle = (np.pi / 2.0 - np.abs(diff_angle)) / np.pi
 
@@ -325,9 +327,9 @@ def cost_vel(Y, X, trackers, velocities, detections, previous_obs, vdc_weight):
     valid_mask[np.where(previous_obs[:, 4] < 0)] = 0
 
     # iou_matrix = iou_batch(detections, trackers)
-    scores = np.repeat(detections[:, -1][:, np.newaxis], trackers.shape[0], axis=1)
+    scores = detections[:, -1][:, np.newaxis]
     # iou_matrix = iou_matrix * scores # a trick sometiems works, we don't encourage this
-    valid_mask = np.repeat(valid_mask[:, np.newaxis], X.shape[1], axis=1)
+    valid_mask = valid_mask[:, np.newaxis]
 
     angle_diff_cost = (valid_mask * diff_angle) * vdc_weight
     angle_diff_cost = angle_diff_cost.T
@@ -411,29 +413,10 @@ def associate_4_points(
     else:
         matched_indices = np.empty(shape=(0, 2))
 
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if (d not in matched_indices[:, 0]):
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if (t not in matched_indices[:, 1]):
-            unmatched_trackers.append(t)
-
     # filter out matched with low IOU
-    matches = []
-    for m in matched_indices:
-        if (iou_matrix[m[0], m[1]] < iou_threshold):
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-        else:
-            matches.append(m.reshape(1, 2))
-    if (len(matches) == 0):
-        matches = np.empty((0, 2), dtype=int)
-    else:
-        matches = np.concatenate(matches, axis=0)
-
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+    matched_indices = np.asarray(matched_indices, dtype=int).reshape(-1, 2)
+    low_iou = iou_matrix[matched_indices[:, 0], matched_indices[:, 1]] < iou_threshold
+    return split_matches(matched_indices, len(detections), len(trackers), low_iou)
 
 
 def associate_4_points_with_score(
@@ -467,29 +450,10 @@ def associate_4_points_with_score(
     else:
         matched_indices = np.empty(shape=(0, 2))
 
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if (d not in matched_indices[:, 0]):
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if (t not in matched_indices[:, 1]):
-            unmatched_trackers.append(t)
-
     # filter out matched with low IOU
-    matches = []
-    for m in matched_indices:
-        if (iou_matrix[m[0], m[1]] < iou_threshold):
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-        else:
-            matches.append(m.reshape(1, 2))
-    if (len(matches) == 0):
-        matches = np.empty((0, 2), dtype=int)
-    else:
-        matches = np.concatenate(matches, axis=0)
-
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+    matched_indices = np.asarray(matched_indices, dtype=int).reshape(-1, 2)
+    low_iou = iou_matrix[matched_indices[:, 0], matched_indices[:, 1]] < iou_threshold
+    return split_matches(matched_indices, len(detections), len(trackers), low_iou)
 
 
 def associate_4_points_with_score_with_reid(
@@ -543,42 +507,16 @@ def associate_4_points_with_score_with_reid(
     else:
         matched_indices = np.empty(shape=(0, 2))
 
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if (d not in matched_indices[:, 0]):
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if (t not in matched_indices[:, 1]):
-            unmatched_trackers.append(t)
-
     # filter out matched with low IOU (and long-term ReID feats)
-    matches = []
+    matched_indices = np.asarray(matched_indices, dtype=int).reshape(-1, 2)
+    d, t = matched_indices[:, 0], matched_indices[:, 1]
     # iou_matrix_thre = iou_matrix if dataset == "dancetrack" else iou_matrix - score_dif
-    iou_matrix_thre = iou_matrix - score_dif
+    rejected = (iou_matrix[d, t] - score_dif[d, t]) < iou_threshold
     if with_longterm_reid_correction:
-        for m in matched_indices:
-            if (emb_cost[m[0], m[1]] > longterm_reid_correction_thresh) and\
-               (iou_matrix_thre[m[0], m[1]] < iou_threshold):
-                print("correction:", emb_cost[m[0], m[1]])
-                unmatched_detections.append(m[0])
-                unmatched_trackers.append(m[1])
-            else:
-                matches.append(m.reshape(1, 2))
-    else:
-        for m in matched_indices:
-            if (iou_matrix_thre[m[0], m[1]] < iou_threshold):
-                unmatched_detections.append(m[0])
-                unmatched_trackers.append(m[1])
-            else:
-                matches.append(m.reshape(1, 2))
-
-    if (len(matches) == 0):
-        matches = np.empty((0, 2), dtype=int)
-    else:
-        matches = np.concatenate(matches, axis=0)
-
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+        rejected &= emb_cost[d, t] > longterm_reid_correction_thresh
+        for corrected_cost in emb_cost[d[rejected], t[rejected]]:
+            LOGGER.debug("correction: {}", corrected_cost)
+    return split_matches(matched_indices, len(detections), len(trackers), rejected)
 
 
 def associate_kitti(
@@ -592,18 +530,16 @@ def associate_kitti(
     """
     Y, X = speed_direction_batch(detections, previous_obs)
     inertia_Y, inertia_X = velocities[:, 0], velocities[:, 1]
-    inertia_Y = np.repeat(inertia_Y[:, np.newaxis], Y.shape[1], axis=1)
-    inertia_X = np.repeat(inertia_X[:, np.newaxis], X.shape[1], axis=1)
-    diff_angle_cos = inertia_X * X + inertia_Y * Y
-    diff_angle_cos = np.clip(diff_angle_cos, a_min=-1, a_max=1)
+    diff_angle_cos = inertia_X[:, np.newaxis] * X + inertia_Y[:, np.newaxis] * Y
+    np.clip(diff_angle_cos, -1, 1, out=diff_angle_cos)
     diff_angle = np.arccos(diff_angle_cos)
     diff_angle = (np.pi / 2.0 - np.abs(diff_angle)) / np.pi
 
     valid_mask = np.ones(previous_obs.shape[0])
     valid_mask[np.where(previous_obs[:, 4] < 0)] = 0
-    valid_mask = np.repeat(valid_mask[:, np.newaxis], X.shape[1], axis=1)
+    valid_mask = valid_mask[:, np.newaxis]
 
-    scores = np.repeat(detections[:, -1][:, np.newaxis], trackers.shape[0], axis=1)
+    scores = detections[:, -1][:, np.newaxis]
     angle_diff_cost = (valid_mask * diff_angle) * vdc_weight
     angle_diff_cost = angle_diff_cost.T
     angle_diff_cost = angle_diff_cost * scores
@@ -635,40 +571,25 @@ def associate_kitti(
     else:
         matched_indices = np.empty(shape=(0, 2))
 
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if (d not in matched_indices[:, 0]):
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if (t not in matched_indices[:, 1]):
-            unmatched_trackers.append(t)
-
     # filter out matched with low IOU
-    matches = []
-    for m in matched_indices:
-        if (iou_matrix[m[0], m[1]] < iou_threshold):
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-        else:
-            matches.append(m.reshape(1, 2))
-    if (len(matches) == 0):
-        matches = np.empty((0, 2), dtype=int)
-    else:
-        matches = np.concatenate(matches, axis=0)
-
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+    matched_indices = np.asarray(matched_indices, dtype=int).reshape(-1, 2)
+    low_iou = iou_matrix[matched_indices[:, 0], matched_indices[:, 1]] < iou_threshold
+    return split_matches(matched_indices, len(detections), len(trackers), low_iou)
 
 
 # compute embedding distance and gating, borrowed and modified from FairMOT
 from scipy.spatial.distance import cdist
 
+from boxmot.utils.matching import cosine_cdist
 
-def embedding_distance(tracks_feat, detections_feat, metric='cosine'):
+
+def embedding_distance(tracks_feat, detections_feat, metric='cosine', normalized=False):
     """
     :param tracks: list[KalmanBoxTracker]
     :param detections: list[KalmanBoxTracker]
     :param metric:
+    :param normalized: both feature sets are already L2-normalized, so the cosine
+        distance is taken straight from one GEMM
     :return: cost_matrix np.ndarray
     """
 
@@ -680,5 +601,12 @@ def embedding_distance(tracks_feat, detections_feat, metric='cosine'):
     #     #cost_matrix[i, :] = np.maximum(0.0, cdist(track.smooth_feat.reshape(1,-1), det_features, metric))
     # track_features = np.asarray([track.smooth_feat for track in tracks], dtype=np.float64)    # [track_num, emd_dim]
     # Nomalized features, metric: cosine, [track_num, detection_num]
-    cost_matrix = np.maximum(0.0, cdist(tracks_feat, detections_feat, metric))
+    if metric == 'cosine' and normalized:
+        cost_matrix = tracks_feat @ detections_feat.T
+        np.subtract(1.0, cost_matrix, out=cost_matrix)
+        np.maximum(0.0, cost_matrix, out=cost_matrix)
+    elif metric == 'cosine':
+        cost_matrix = np.maximum(0.0, cosine_cdist(tracks_feat, detections_feat))
+    else:
+        cost_matrix = np.maximum(0.0, cdist(tracks_feat, detections_feat, metric))
     return cost_matrix
@@ -14,6 +14,8 @@ from boxmot.trackers.hybridsort.association import (
     associate_4_points_with_score, associate_4_points_with_score_with_reid,
     cal_score_dif_batch_two_score, embedding_distance, linear_assignment)
 from boxmot.trackers.basetracker import BaseTracker
+from boxmot.utils.association import remove_indices
+from boxmot.utils import logger as LOGGER
 
 
 np.random.seed(0)
@@ -201,7 +203,7 @@ class KalmanBoxTracker(object):
         feat /= np.linalg.norm(feat)
         self.curr_feat = feat
         if self.smooth_feat is None:
-            self.smooth_feat = feat
+            self.smooth_feat = feat.copy()  # track-owned buffer for the in-place EMA below
         else:
             if self.adapfs:
                 assert score > 0
@@ -210,9 +212,10 @@ class KalmanBoxTracker(object):
                 sum_w = pre_w + cur_w
                 pre_w = pre_w / sum_w
                 cur_w = cur_w / sum_w
-                self.smooth_feat = pre_w * self.smooth_feat + cur_w * feat
             else:
-                self.smooth_feat = self.alpha * self.smooth_feat + (1 - self.alpha) * feat
+                pre_w, cur_w = self.alpha, 1 - self.alpha
+            self.smooth_feat *= pre_w
+            self.smooth_feat += cur_w * feat
         self.features.append(feat)
         self.smooth_feat /= np.linalg.norm(self.smooth_feat)
 
@@ -224,8 +227,7 @@ class KalmanBoxTracker(object):
         warp_matrix: warp matrix computed by ECC.
         """
         x1, y1, x2, y2, s = convert_x_to_bbox(self.kf.x)[0]
-        x1_, y1_ = warp_matrix @ np.array([x1, y1, 1]).T
-        x2_, y2_ = warp_matrix @ np.array([x2, y2, 1]).T
+        (x1_, y1_), (x2_, y2_) = np.array([[x1, y1, 1], [x2, y2, 1]]) @ warp_matrix.T
         # w, h = x2_ - x1_, y2_ - y1_
         # cx, cy = x1_ + w / 2, y1_ + h / 2
         self.kf.x[:5] = convert_bbox_to_z([x1_, y1_, x2_, y2_, s])
@@ -460,7 +462,7 @@ class HybridSort(BaseTracker):
         if self.EG_weight_high_score > 0 and self.TCM_first_step:
             track_features = np.asarray([track.smooth_feat for track in self.active_tracks],
                                         dtype=np.float64)
-            emb_dists = embedding_distance(track_features, id_feature_keep).T
+            emb_dists = embedding_distance(track_features, id_feature_keep, normalized=True).T
             if self.with_longterm_reid or self.with_longterm_reid_correction:
                 long_track_features = np.asarray([np.vstack(list(track.features)).mean(0) for track in self.active_tracks],
                                                  dtype=np.float64)
@@ -512,7 +514,7 @@ class HybridSort(BaseTracker):
                     iou_left_thre = iou_left
                 if self.EG_weight_low_score > 0:
                     u_track_features = np.asarray([track.smooth_feat for track in u_tracklets], dtype=np.float64)
-                    emb_dists_low_score = embedding_distance(u_track_features, id_feature_second).T
+                    emb_dists_low_score = embedding_distance(u_track_features, id_feature_second, normalized=True).T
                     matched_indices = linear_assignment(-iou_left + self.EG_weight_low_score * emb_dists_low_score,
                                                         )
                 else:
@@ -523,7 +525,7 @@ class HybridSort(BaseTracker):
                     if self.with_longterm_reid_correction and self.EG_weight_low_score > 0:
                         if (iou_left_thre[m[0], m[1]] < self.iou_threshold) or \
                            (emb_dists_low_score[m[0], m[1]] > self.longterm_reid_correction_thresh_low):
-                            print("correction 2nd:", emb_dists_low_score[m[0], m[1]])
+                            LOGGER.debug("correction 2nd: {}", emb_dists_low_score[m[0], m[1]])
                             continue
                     else:
                         if iou_left_thre[m[0], m[1]] < self.iou_threshold:
@@ -534,7 +536,7 @@ class HybridSort(BaseTracker):
                         update_feature=False
                     )     # [hgx0523] do not update with id feature
                     to_remove_trk_indices.append(trk_ind)
-                unmatched_trks = np.setdiff1d(unmatched_trks, np.array(to_remove_trk_indices))
+                unmatched_trks = remove_indices(unmatched_trks, to_remove_trk_indices)
 
         if unmatched_dets.shape[0] > 0 and unmatched_trks.shape[0] > 0:
             left_dets = dets[unmatched_dets]
@@ -565,8 +567,8 @@ class HybridSort(BaseTracker):
                     )
                     to_remove_det_indices.append(det_ind)
                     to_remove_trk_indices.append(trk_ind)
-                unmatched_dets = np.setdiff1d(unmatched_dets, np.array(to_remove_det_indices))
-                unmatched_trks = np.setdiff1d(unmatched_trks, np.array(to_remove_trk_indices))
+                unmatched_dets = remove_indices(unmatched_dets, to_remove_det_indices)
+                unmatched_trks = remove_indices(unmatched_trks, to_remove_trk_indices)
 
         for m in unmatched_trks:
             self.active_tracks[m].update(None, None, None, None)
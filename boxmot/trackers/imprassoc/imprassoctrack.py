@@ -28,7 +28,7 @@ class STrack(BaseTrack):
         self.kalman_filter = None
         self.mean, self.covariance = None, None
         self.is_activated = False
-        self.cls_hist = []  # (cls id, freq)
+        self.cls_hist = {}  # cls id -> accumulated conf
         self.update_cls(self.cls, self.conf)
         self.history_observations = deque([], maxlen=self.max_obs)
 
@@ -42,32 +42,22 @@ class STrack(BaseTrack):
         self.alpha = 0.9
 
     def update_features(self, feat):
-        feat /= np.linalg.norm(feat)
+        feat /= np.sqrt(feat @ feat)
         self.curr_feat = feat
         if self.smooth_feat is None:
-            self.smooth_feat = feat
+            self.smooth_feat = feat.copy()
         else:
-            self.smooth_feat = self.alpha * self.smooth_feat + (1 - self.alpha) * feat
+            self.smooth_feat *= self.alpha
+            self.smooth_feat += (1 - self.alpha) * feat
+            self.smooth_feat /= np.sqrt(self.smooth_feat @ self.smooth_feat)
         self.features.append(feat)
-        self.smooth_feat /= np.linalg.norm(self.smooth_feat)
 
     def update_cls(self, cls, conf):
-        if len(self.cls_hist) > 0:
-            max_freq = 0
-            found = False
-            for c in self.cls_hist:
-                if cls == c[0]:
-                    c[1] += conf
-                    found = True
-
-                if c[1] > max_freq:
-                    max_freq = c[1]
-                    self.cls = c[0]
-            if not found:
-                self.cls_hist.append([cls, conf])
-                self.cls = cls
+        if cls in self.cls_hist:
+            self.cls_hist[cls] += conf
+            self.cls = max(self.cls_hist, key=self.cls_hist.get)
         else:
-            self.cls_hist.append([cls, conf])
+            self.cls_hist[cls] = conf
             self.cls = cls
 
     def predict(self):
@@ -81,14 +71,18 @@ class STrack(BaseTrack):
         )
 
     @staticmethod
-    def multi_predict(stracks):
+    def multi_predict(stracks, H=None):
+        """Batch KF prediction, preceded by the camera motion compensation `H`
+        if given (same as a prior `multi_gmc`)."""
         if len(stracks) > 0:
-            multi_mean = np.asarray([st.mean.copy() for st in stracks])
-            multi_covariance = np.asarray([st.covariance for st in stracks])
-            for i, st in enumerate(stracks):
-                if st.state != TrackState.Tracked:
-                    multi_mean[i][6] = 0
-                    multi_mean[i][7] = 0
+            multi_mean = np.stack([st.mean for st in stracks])
+            multi_covariance = np.stack([st.covariance for st in stracks])
+            if H is not None:
+                multi_mean, multi_covariance = STrack._warp_states(multi_mean, multi_covariance, H)
+            tracked = np.fromiter(
+                (st.state == TrackState.Tracked for st in stracks), dtype=bool, count=len(stracks)
+            )
+            multi_mean[:, 6:8] *= tracked[:, None]  # reset velocities of non-tracked tracks
             multi_mean, multi_covariance = STrack.shared_kalman.multi_predict(
                 multi_mean, multi_covariance
             )
@@ -99,27 +93,54 @@ class STrack(BaseTrack):
     @staticmethod
     def multi_gmc(stracks, H=np.eye(2, 3)):
         if len(stracks) > 0:
-            multi_mean = np.asarray([st.mean.copy() for st in stracks])
-            multi_covariance = np.asarray([st.covariance for st in stracks])
-
-            R = H[:2, :2]
-            R8x8 = np.kron(np.eye(4, dtype=float), R)
-            t = H[:2, 2]
+            multi_mean, multi_covariance = STrack._warp_states(
+                np.stack([st.mean for st in stracks]), np.stack([st.covariance for st in stracks]), H
+            )
 
             for i, (mean, cov) in enumerate(zip(multi_mean, multi_covariance)):
-                mean = R8x8.dot(mean)
-                mean[:2] += t
-                cov = R8x8.dot(cov).dot(R8x8.transpose())
-
                 stracks[i].mean = mean
                 stracks[i].covariance = cov
 
-    def activate(self, kalman_filter, frame_count):
-        """Start a new tracklet"""
+    @staticmethod
+    def _warp_states(multi_mean, multi_covariance, H):
+        R = H[:2, :2]
+        R8x8 = np.kron(np.eye(4, dtype=float), R)
+        t = H[:2, 2]
+
+        multi_mean = multi_mean @ R8x8.T
+        multi_mean[:, :2] += t
+        multi_covariance = R8x8 @ multi_covariance @ R8x8.T
+        return multi_mean, multi_covariance
+
+    @staticmethod
+    def multi_update(stracks, detections):
+        """Run the Kalman correction of every (track, detection) pair in one batch and
+        return the new (mean, covariance) per track, to be passed to `update` / `re_activate`."""
+        if len(stracks) == 0:
+            return []
+        multi_mean, multi_covariance = STrack.shared_kalman.multi_update(
+            np.stack([st.mean for st in stracks]),
+            np.stack([st.covariance for st in stracks]),
+            np.stack([det.xywh for det in detections]),
+            np.array([st.conf for st in stracks]),
+        )
+        return list(zip(multi_mean, multi_covariance))
+
+    @staticmethod
+    def multi_initiate(stracks, kalman_filter):
+        """Initiate the Kalman states of all new tracks in one batch and return the
+        (mean, covariance) per track, to be passed to `activate`."""
+        if len(stracks) == 0:
+            return []
+        multi_mean, multi_covariance = kalman_filter.multi_initiate(np.stack([st.xywh for st in stracks]))
+        return list(zip(multi_mean, multi_covariance))
+
+    def activate(self, kalman_filter, frame_count, state=None):
+        """Start a new tracklet. `state` is its batched KF initiation, if computed."""
         self.kalman_filter = kalman_filter
         self.id = self.next_id()
 
-        self.mean, self.covariance = self.kalman_filter.initiate(self.xywh)
+        self.mean, self.covariance = state if state is not None else self.kalman_filter.initiate(self.xywh)
 
         self.tracklet_len = 0
         self.state = TrackState.Tracked
@@ -128,8 +149,8 @@ class STrack(BaseTrack):
         self.frame_count = frame_count
         self.start_frame = frame_count
 
-    def re_activate(self, new_track, frame_count, new_id=False):
-        self.mean, self.covariance = self.kalman_filter.update(
+    def re_activate(self, new_track, frame_count, new_id=False, state=None):
+        self.mean, self.covariance = state if state is not None else self.kalman_filter.update(
             self.mean, self.covariance, new_track.xywh, self.conf
         )
         if new_track.curr_feat is not None:
@@ -146,12 +167,12 @@ class STrack(BaseTrack):
 
         self.update_cls(new_track.cls, new_track.conf)
 
-    def update(self, new_track, frame_count):
+    def update(self, new_track, frame_count, state=None):
         """
         Update a matched track
         :type new_track: STrack
         :type frame_count: int
-        :type update_feature: bool
+        :type state: (mean, covariance) from `multi_update`, if already computed
         :return:
         """
         self.frame_count = frame_count
@@ -159,7 +180,7 @@ class STrack(BaseTrack):
 
         self.history_observations.append(self.xyxy)
 
-        self.mean, self.covariance = self.kalman_filter.update(
+        self.mean, self.covariance = state if state is not None else self.kalman_filter.update(
             self.mean, self.covariance, new_track.xywh, self.conf
         )
 
@@ -174,17 +195,27 @@ class STrack(BaseTrack):
         self.det_ind = new_track.det_ind
         self.update_cls(new_track.cls, new_track.conf)
 
+    @property
+    def mean(self):
+        return self._mean
+
+    @mean.setter
+    def mean(self, mean):
+        self._mean = mean
+        self._xyxy = None  # invalidate the cached `xyxy`
+
     @property
     def xyxy(self):
         """Convert bounding box to format `(min x, min y, max x, max y)`, i.e.,
-        `(top left, bottom right)`.
+        `(top left, bottom right)`. Cached until `mean` changes.
         """
-        if self.mean is None:
-            ret = self.xywh.copy()  # (xc, yc, w, h)
-        else:
-            ret = self.mean[:4].copy()  # kf (xc, yc, w, h)
-        ret = xywh2xyxy(ret)
-        return ret
+        if self._xyxy is None:
+            if self.mean is None:
+                ret = self.xywh.copy()  # (xc, yc, w, h)
+            else:
+                ret = self.mean[:4].copy()  # kf (xc, yc, w, h)
+            self._xyxy = xywh2xyxy(ret)
+        return self._xyxy
 
 
 class ImprAssocTrack(BaseTracker):
@@ -234,6 +265,7 @@ class ImprAssocTrack(BaseTracker):
         self.active_tracks = []  # type: list[STrack]
         self.lost_stracks = []  # type: list[STrack]
         self.removed_stracks = []  # type: list[STrack]
+        self._removed_ids = set()  # ids of `removed_stracks`, kept in step with it
         BaseTrack.clear_count()
 
         self.per_class = per_class
@@ -275,7 +307,7 @@ class ImprAssocTrack(BaseTracker):
         lost_stracks = []
         removed_stracks = []
 
-        dets = np.hstack([dets, np.arange(len(dets)).reshape(-1, 1)])
+        dets = self.append_det_indices(dets)
 
         # Remove bad detections
         confs = dets[:, 4]
@@ -302,7 +334,7 @@ class ImprAssocTrack(BaseTracker):
             if self.with_reid:
                 detections = [STrack(det, f, max_obs=self.max_obs) for (det, f) in zip(dets_first, features_high)]
             else:
-                detections = [STrack(det, max_obs=self.max_obs) for (det) in np.array(dets_first)]
+                detections = [STrack(det, max_obs=self.max_obs) for (det) in dets_first]
         else:
             detections = []
 
@@ -329,11 +361,10 @@ class ImprAssocTrack(BaseTracker):
 
         # Fix camera motion
         warp = self.cmc.apply(img, dets_first)
-        STrack.multi_gmc(strack_pool, warp)
         STrack.multi_gmc(unconfirmed, warp)
 
-        # Predict the current location with KF
-        STrack.multi_predict(strack_pool)
+        # Fix camera motion and predict the current location with KF in one pass
+        STrack.multi_predict(strack_pool, warp)
 
         # Associate with high score detection boxes
         d_ious_dists = d_iou_distance(strack_pool, detections)
@@ -360,8 +391,9 @@ class ImprAssocTrack(BaseTracker):
             # dists[ious_dists_mask] = 1.0
 
             # Improved Association Version (CD)
-            emb_dists = embedding_distance(strack_pool, detections) # high dets
-            dists = self.lambda_*d_ious_dists + (1-self.lambda_)*emb_dists
+            emb_dists = embedding_distance(strack_pool, detections, gate=~ious_dists_mask, normalized=True) # high dets
+            dists = np.multiply(emb_dists, 1 - self.lambda_, out=emb_dists)
+            dists += self.lambda_ * d_ious_dists
             dists[ious_dists_mask] = self.match_thresh + 0.00001
         else:
             dists = d_ious_dists
@@ -373,7 +405,7 @@ class ImprAssocTrack(BaseTracker):
         if len(dets_second) > 0:
             '''Detections'''
             detections_second = [STrack(det, max_obs=self.max_obs) for
-                                 (det) in np.array(dets_second)]
+                                 (det) in dets_second]
         else:
             detections_second = []
         dists_second = iou_distance(strack_pool, detections_second)
@@ -390,14 +422,14 @@ class ImprAssocTrack(BaseTracker):
         # concat detections so that it all works
         detections = np.concatenate((detections, detections_second), axis=0)
 
-        for itracked, idet in matches:
-            track = strack_pool[itracked]
-            det = detections[idet]
+        tracks = [strack_pool[i] for i in matches[:, 0]]
+        matched_dets = [detections[i] for i in matches[:, 1]]
+        for track, det, state in zip(tracks, matched_dets, STrack.multi_update(tracks, matched_dets)):
             if track.state == TrackState.Tracked:
-                track.update(detections[idet], self.frame_count)
+                track.update(det, self.frame_count, state=state)
                 activated_starcks.append(track)
             else:
-                track.re_activate(det, self.frame_count, new_id=False)
+                track.re_activate(det, self.frame_count, new_id=False, state=state)
                 refind_stracks.append(track)
 
         '''Deal with lost tracks'''
@@ -426,24 +458,20 @@ class ImprAssocTrack(BaseTracker):
 
         unmatched_overlap = 1 - iou_distance(strack_pool, sdet_remain)
 
-        for det_ind in range(unmatched_overlap.shape[1]): # loop over the rows
-            if len(unmatched_overlap[:, det_ind]) != 0:
-                if np.max(unmatched_overlap[:, det_ind]) < self.overlap_thresh:
-                    # now initialize it
-                    track = sdet_remain[det_ind]
-                    if track.conf > self.new_track_thresh:
-                        track.activate(self.kalman_filter, self.frame_count)
-                        if self.with_reid:
-                            track.update_features(features[det_ind])
-                        activated_starcks.append(track)
-            else:
-                # if no curr tracks, then init one
-                track = sdet_remain[det_ind]
-                if track.conf > self.new_track_thresh:
-                    track.activate(self.kalman_filter, self.frame_count)
-                    if self.with_reid:
-                        track.update_features(features[det_ind])
-                    activated_starcks.append(track)
+        # a det starts a track only if confident enough and not overlapping any
+        # current track (with no current tracks, every det qualifies)
+        init_mask = np.fromiter(
+            (track.conf > self.new_track_thresh for track in sdet_remain), dtype=bool, count=len(sdet_remain)
+        )
+        if len(strack_pool) > 0:
+            init_mask &= unmatched_overlap.max(axis=0) < self.overlap_thresh
+        new_inds = np.flatnonzero(init_mask)
+        new_tracks = [sdet_remain[det_ind] for det_ind in new_inds]
+        for det_ind, track, state in zip(new_inds, new_tracks, STrack.multi_initiate(new_tracks, self.kalman_filter)):
+            track.activate(self.kalman_filter, self.frame_count, state)
+            if self.with_reid:
+                track.update_features(features[det_ind])
+            activated_starcks.append(track)
 
 
         """ Step 6: Update state"""
@@ -460,63 +488,49 @@ class ImprAssocTrack(BaseTracker):
         self.active_tracks = joint_stracks(self.active_tracks, refind_stracks)
         self.lost_stracks = sub_stracks(self.lost_stracks, self.active_tracks)
         self.lost_stracks.extend(lost_stracks)
-        self.lost_stracks = sub_stracks(self.lost_stracks, self.removed_stracks)
+        self.lost_stracks = [t for t in self.lost_stracks if t.id not in self._removed_ids]
         self.removed_stracks.extend(removed_stracks)
+        self._removed_ids.update(t.id for t in removed_stracks)
         self.active_tracks, self.lost_stracks = remove_duplicate_stracks(
             self.active_tracks, self.lost_stracks
         )
 
         output_stracks = [track for track in self.active_tracks]
-        outputs = []
-        for t in output_stracks:
-            output = []
-            output.extend(t.xyxy)
-            output.append(t.id)
-            output.append(t.conf)
-            output.append(t.cls)
-            output.append(t.det_ind)
-            outputs.append(output)
-
-        outputs = np.asarray(outputs)
-        return outputs
+        outputs = [
+            [*t.xyxy, t.id, t.conf, t.cls, t.det_ind]
+            for t in output_stracks
+        ]
+        return np.asarray(outputs)
 
 
 def joint_stracks(tlista, tlistb):
-    exists = {}
-    res = []
-    for t in tlista:
-        exists[t.id] = 1
-        res.append(t)
+    seen = {t.id for t in tlista}
+    res = list(tlista)
     for t in tlistb:
-        tid = t.id
-        if not exists.get(tid, 0):
-            exists[tid] = 1
+        if t.id not in seen:
+            seen.add(t.id)
             res.append(t)
     return res
 
 
 def sub_stracks(tlista, tlistb):
-    stracks = {}
-    for t in tlista:
-        stracks[t.id] = t
-    for t in tlistb:
-        tid = t.id
-        if stracks.get(tid, 0):
-            del stracks[tid]
-    return list(stracks.values())
+    ids_b = {t.id for t in tlistb}
+    return [t for t in tlista if t.id not in ids_b]
 
 
 def remove_duplicate_stracks(stracksa, stracksb):
     pdist = iou_distance(stracksa, stracksb)
-    pairs = np.where(pdist < 0.15)
-    dupa, dupb = list(), list()
-    for p, q in zip(*pairs):
-        timep = stracksa[p].frame_count - stracksa[p].start_frame
-        timeq = stracksb[q].frame_count - stracksb[q].start_frame
-        if timep > timeq:
-            dupb.append(q)
-        else:
-            dupa.append(p)
-    resa = [t for i, t in enumerate(stracksa) if i not in dupa]
-    resb = [t for i, t in enumerate(stracksb) if i not in dupb]
+    p, q = np.nonzero(pdist < 0.15)
+    if len(p) == 0:
+        return list(stracksa), list(stracksb)
+    timea = np.array([t.frame_count - t.start_frame for t in stracksa])
+    timeb = np.array([t.frame_count - t.start_frame for t in stracksb])
+    # for each overlapping pair drop the younger track (ties drop the one from stracksa)
+    a_older = timea[p] > timeb[q]
+    keepa = np.ones(len(stracksa), dtype=bool)
+    keepb = np.ones(len(stracksb), dtype=bool)
+    keepa[p[~a_older]] = False
+    keepb[q[a_older]] = False
+    resa = [t for t, keep in zip(stracksa, keepa) if keep]
+    resb = [t for t, keep in zip(stracksb, keepb) if keep]
     return resa, resb
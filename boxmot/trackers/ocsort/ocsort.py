@@ -8,7 +8,7 @@ from collections import deque
 
 
 from boxmot.motion.kalman_filters.aabb.xysr_kf import KalmanFilterXYSR
-from boxmot.utils.association import associate, linear_assignment
+from boxmot.utils.association import associate, linear_assignment, remove_indices
 from boxmot.trackers.basetracker import BaseTracker
 from boxmot.utils.ops import xyxy2xysr
 from boxmot.motion.kalman_filters.obb.xywha_kf import KalmanBoxTrackerOBB
@@ -250,7 +250,7 @@ class OcSort(BaseTracker):
         self.frame_count += 1
         h, w = img.shape[0:2]
 
-        dets = np.hstack([dets, np.arange(len(dets)).reshape(-1, 1)])
+        dets = self.append_det_indices(dets)
         confs = dets[:, 4+self.is_obb] 
 
         inds_low = confs > self.min_conf
@@ -325,9 +325,7 @@ class OcSort(BaseTracker):
                         dets_second[det_ind, :-2], dets_second[det_ind, -2], dets_second[det_ind, -1]
                     )
                     to_remove_trk_indices.append(trk_ind)
-                unmatched_trks = np.setdiff1d(
-                    unmatched_trks, np.array(to_remove_trk_indices)
-                )
+                unmatched_trks = remove_indices(unmatched_trks, to_remove_trk_indices)
 
         if unmatched_dets.shape[0] > 0 and unmatched_trks.shape[0] > 0:
             left_dets = dets[unmatched_dets]
@@ -350,12 +348,8 @@ class OcSort(BaseTracker):
                     self.active_tracks[trk_ind].update(dets[det_ind, :-2], dets[det_ind, -2], dets[det_ind, -1])
                     to_remove_det_indices.append(det_ind)
                     to_remove_trk_indices.append(trk_ind)
-                unmatched_dets = np.setdiff1d(
-                    unmatched_dets, np.array(to_remove_det_indices)
-                )
-                unmatched_trks = np.setdiff1d(
-                    unmatched_trks, np.array(to_remove_trk_indices)
-                )
+                unmatched_dets = remove_indices(unmatched_dets, to_remove_det_indices)
+                unmatched_trks = remove_indices(unmatched_trks, to_remove_trk_indices)
 
         for m in unmatched_trks:
             self.active_tracks[m].update(None, None, None)
@@ -129,16 +129,33 @@ class Track:
         return ret
 
     def camera_update(self, warp_matrix):
-        [a, b] = warp_matrix
-        warp_matrix = np.array([a, b, [0, 0, 1]])
-        warp_matrix = warp_matrix.tolist()
         x1, y1, x2, y2 = self.to_tlbr()
-        x1_, y1_, _ = warp_matrix @ np.array([x1, y1, 1]).T
-        x2_, y2_, _ = warp_matrix @ np.array([x2, y2, 1]).T
+        # warp both corners with one product on the affine rows
+        (x1_, y1_), (x2_, y2_) = np.array([[x1, y1, 1], [x2, y2, 1]]) @ warp_matrix[:2].T
         w, h = x2_ - x1_, y2_ - y1_
         cx, cy = x1_ + w / 2, y1_ + h / 2
         self.mean[:4] = [cx, cy, w / h, h]
 
+    @staticmethod
+    def multi_camera_update(tracks, warp_matrix):
+        """Batched `camera_update`: the corners of all `tracks` are written into one
+        homogeneous buffer and warped by a single product."""
+        if not tracks:
+            return
+        tlbr = np.stack([track.mean[:4] for track in tracks])
+        tlbr[:, 2] *= tlbr[:, 3]
+        tlbr[:, :2] -= tlbr[:, 2:] / 2
+        tlbr[:, 2:] += tlbr[:, :2]
+
+        corners = np.ones((2 * len(tracks), 3))
+        corners[:, :2] = tlbr.reshape(-1, 2)  # rows (x1, y1), (x2, y2) per track
+        warped = (corners @ warp_matrix[:2].T).reshape(-1, 4)
+
+        wh = warped[:, 2:] - warped[:, :2]
+        cxcy = warped[:, :2] + wh / 2
+        for track, (cx, cy), (w, h) in zip(tracks, cxcy, wh):
+            track.mean[:4] = [cx, cy, w / h, h]
+
     def increment_age(self):
         self.age += 1
         self.time_since_update += 1
@@ -7,6 +7,7 @@ from pathlib import Path
 from boxmot.appearance.reid.auto_backend import ReidAutoBackend
 from boxmot.motion.cmc import get_cmc_method
 from boxmot.trackers.strongsort.sort.detection import Detection
+from boxmot.trackers.strongsort.sort.track import Track
 from boxmot.trackers.strongsort.sort.tracker import Tracker
 from boxmot.utils.matching import NearestNeighborDistanceMetric
 from boxmot.utils.ops import xyxy2tlwh
@@ -77,19 +78,18 @@ class StrongSort(object):
             dets.shape[1] == 6
         ), "Unsupported 'dets' 2nd dimension lenght, valid lenghts is 6"
 
-        dets = np.hstack([dets, np.arange(len(dets)).reshape(-1, 1)])
         remain_inds = dets[:, 4] >= self.min_conf
+        # the detection indices are carried on their own instead of as an extra column
+        det_ind = np.flatnonzero(remain_inds)
         dets = dets[remain_inds]
 
         xyxy = dets[:, 0:4]
         confs = dets[:, 4]
         clss = dets[:, 5]
-        det_ind = dets[:, 6]
 
         if len(self.tracker.tracks) >= 1:
             warp_matrix = self.cmc.apply(img, xyxy)
-            for track in self.tracker.tracks:
-                track.camera_update(warp_matrix)
+            Track.multi_camera_update(self.tracker.tracks, warp_matrix)
 
         # extract appearance information for each detection
         if embs is not None:
@@ -0,0 +1,118 @@
+# Mikel Broström 🔥 Yolo Tracking 🧾 AGPL-3.0 license
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from boxmot.utils.iou import AssociationFunction
+from boxmot.utils.matching import linear_assignment
+
+
+def _track_window(make_tracker, dets_n_embs, frame_nums, load_img):
+    """
+    Run a fresh tracker over `frame_nums` and return its outputs with the frame number
+    prepended, i.e. rows of (frame, x1, y1, x2, y2, id, conf, cls, det_ind).
+    """
+    tracker = make_tracker()
+    has_embs = dets_n_embs.shape[1] > 7
+    results = []
+    for frame_num in frame_nums:
+        frame_rows = dets_n_embs[dets_n_embs[:, 0] == frame_num]
+        embs = frame_rows[:, 7:] if has_embs else None
+        tracks = tracker.update(frame_rows[:, 1:7], load_img(frame_num), embs)
+        if tracks.size > 0:
+            results.append(np.column_stack((np.full(len(tracks), frame_num), tracks)))
+    return np.vstack(results) if results else np.empty((0, 9))
+
+
+def _overlap_iou(prev, curr, frame_nums):
+    """
+    Mean IoU between every track id of `prev` and of `curr` over the frames in which both
+    are present. Returns the ids of both sides and the (len(prev_ids), len(curr_ids)) matrix.
+    """
+    prev = prev[np.isin(prev[:, 0], frame_nums)]
+    curr = curr[np.isin(curr[:, 0], frame_nums)]
+    prev_ids, prev_inv = np.unique(prev[:, 5], return_inverse=True)
+    curr_ids, curr_inv = np.unique(curr[:, 5], return_inverse=True)
+
+    iou_sum = np.zeros((len(prev_ids), len(curr_ids)))
+    co_frames = np.zeros((len(prev_ids), len(curr_ids)))
+    for frame_num in frame_nums:
+        p = np.flatnonzero(prev[:, 0] == frame_num)
+        c = np.flatnonzero(curr[:, 0] == frame_num)
+        if len(p) == 0 or len(c) == 0:
+            continue
+        rows, cols = np.ix_(prev_inv[p], curr_inv[c])
+        iou_sum[rows, cols] += AssociationFunction.iou_batch(prev[p, 1:5], curr[c, 1:5])
+        co_frames[rows, cols] += 1
+
+    mean_iou = np.divide(iou_sum, co_frames, out=np.zeros_like(iou_sum), where=co_frames > 0)
+    return prev_ids, curr_ids, mean_iou
+
+
+def track_windows(make_tracker, dets_n_embs, load_img, window_size=2000, overlap=30, n_jobs=4,
+                  iou_threshold=0.5):
+    """
+    Offline tracking of a long sequence by splitting it into windows that are tracked
+    independently in parallel and stitched together afterwards.
+
+    Each window is tracked by its own tracker, starting `overlap` frames before the window
+    so that its tracks are already confirmed where the window begins. Track ids are then
+    linked sequentially: the tracks of two neighbouring windows are matched on their mean
+    IoU over the shared frames, matched tracks keep the id of the earlier window and the
+    remaining ones get new ids. The results of the warm-up frames are discarded.
+
+    Parameters:
+    - make_tracker (callable): Returns a new tracker, e.g.
+      functools.partial(create_tracker, 'ocsort', get_tracker_config('ocsort')).
+    - dets_n_embs (np.ndarray): Rows of (frame, x1, y1, x2, y2, conf, cls, *emb) for the
+      whole sequence. Without embedding columns, trackers extract features themselves.
+    - load_img (callable): Maps a frame number to its image. For motion-only trackers
+      without camera motion compensation a blank frame of the right size is enough.
+    - window_size (int): Number of frames per window.
+    - overlap (int): Number of warm-up frames each window shares with the previous one.
+    - n_jobs (int): Number of windows tracked in parallel.
+    - iou_threshold (float): Minimum mean IoU for two tracks to be stitched.
+
+    Returns:
+    - np.ndarray: Rows of (frame, x1, y1, x2, y2, id, conf, cls, det_ind) with the ids
+      consistent over the whole sequence.
+    """
+    if len(dets_n_embs) == 0:
+        return np.empty((0, 9))
+    first, last = int(dets_n_embs[:, 0].min()), int(dets_n_embs[:, 0].max())
+    starts = range(first, last + 1, window_size)
+    spans = [(max(first, s - overlap), s, min(s + window_size, last + 1)) for s in starts]
+
+    # make_tracker and load_img only need to be picklable by cloudpickle, which loky uses
+    windows = Parallel(n_jobs=n_jobs, backend="loky")(
+        delayed(_track_window)(
+            make_tracker,
+            dets_n_embs[(dets_n_embs[:, 0] >= warmup) & (dets_n_embs[:, 0] < end)],
+            range(warmup, end),
+            load_img,
+        )
+        for warmup, _, end in spans
+    )
+
+    results = []
+    next_id = 1
+    prev = None  # previous window, already carrying the global ids
+    for (warmup, start, _), window in zip(spans, windows):
+        new_map = {}
+        if prev is not None and len(prev) and len(window):
+            prev_ids, curr_ids, mean_iou = _overlap_iou(prev, window, np.arange(warmup, start))
+            matches, _, _ = linear_assignment(1 - mean_iou, thresh=1 - iou_threshold)
+            for p, c in matches:
+                new_map[curr_ids[c]] = prev_ids[p]
+
+        window = window[window[:, 0] >= start]
+        for track_id in np.unique(window[:, 5]):
+            if track_id not in new_map:
+                new_map[track_id] = next_id
+                next_id += 1
+        if len(window):
+            window[:, 5] = [new_map[track_id] for track_id in window[:, 5]]
+            results.append(window)
+        prev = window
+
+    return np.vstack(results) if results else np.empty((0, 9))
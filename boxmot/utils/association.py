@@ -20,12 +20,45 @@ def speed_direction_batch(dets, tracks):
 def linear_assignment(cost_matrix):
     try:
         import lap
-        _, x, y = lap.lapjv(cost_matrix, extend_cost=True)
-        return np.array([[y[i], i] for i in x if i >= 0])  #
+        _, x, _ = lap.lapjv(cost_matrix, extend_cost=True)
+        rows = np.flatnonzero(x >= 0)  # (row, x[row]) pairs in row order
+        return np.column_stack((rows, x[rows]))
     except ImportError:
         from scipy.optimize import linear_sum_assignment
         x, y = linear_sum_assignment(cost_matrix)
-        return np.array([list(zip(x, y))])
+        return np.column_stack((x, y))
+
+
+def split_matches(matched_indices, num_dets, num_trks, rejected):
+    """
+    Splits an assignment into matches and unmatched detection / tracker indices with
+    boolean masks. `matched_indices` is an int (K, 2) array of (det, trk) pairs and
+    `rejected` a (K,) bool mask of assigned pairs to hand back as unmatched; those are
+    appended after the indices that were never assigned.
+    """
+    det_assigned = np.zeros(num_dets, dtype=bool)
+    det_assigned[matched_indices[:, 0]] = True
+    trk_assigned = np.zeros(num_trks, dtype=bool)
+    trk_assigned[matched_indices[:, 1]] = True
+
+    unmatched_detections = np.concatenate((np.flatnonzero(~det_assigned), matched_indices[rejected, 0]))
+    unmatched_trackers = np.concatenate((np.flatnonzero(~trk_assigned), matched_indices[rejected, 1]))
+    return matched_indices[~rejected], unmatched_detections, unmatched_trackers
+
+
+def remove_indices(indices, to_remove):
+    """
+    Returns the sorted unique `indices` without `to_remove`, a subset of them. Same as
+    np.setdiff1d for non-negative integer indices, but both sets are marked on a boolean
+    mask instead of being sorted and deduplicated.
+    """
+    indices = np.asarray(indices, dtype=int)
+    if indices.size == 0:
+        return indices
+    keep = np.zeros(indices.max() + 1, dtype=bool)
+    keep[indices] = True
+    keep[np.asarray(to_remove, dtype=int)] = False
+    return np.flatnonzero(keep)
 
 
 def associate_detections_to_trackers(detections, trackers, iou_threshold=0.3):
@@ -51,29 +84,10 @@ def associate_detections_to_trackers(detections, trackers, iou_threshold=0.3):
     else:
         matched_indices = np.empty(shape=(0, 2))
 
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if d not in matched_indices[:, 0]:
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if t not in matched_indices[:, 1]:
-            unmatched_trackers.append(t)
-
     # filter out matched with low IOU
-    matches = []
-    for m in matched_indices:
-        if iou_matrix[m[0], m[1]] < iou_threshold:
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-        else:
-            matches.append(m.reshape(1, 2))
-    if len(matches) == 0:
-        matches = np.empty((0, 2), dtype=int)
-    else:
-        matches = np.concatenate(matches, axis=0)
-
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+    matched_indices = np.asarray(matched_indices, dtype=int).reshape(-1, 2)
+    low_iou = iou_matrix[matched_indices[:, 0], matched_indices[:, 1]] < iou_threshold
+    return split_matches(matched_indices, len(detections), len(trackers), low_iou)
 
 
 def compute_aw_max_metric(emb_cost, w_association_emb, bottom=0.5):
@@ -133,10 +147,8 @@ def associate(
 
     Y, X = speed_direction_batch(detections, previous_obs)
     inertia_Y, inertia_X = velocities[:, 0], velocities[:, 1]
-    inertia_Y = np.repeat(inertia_Y[:, np.newaxis], Y.shape[1], axis=1)
-    inertia_X = np.repeat(inertia_X[:, np.newaxis], X.shape[1], axis=1)
-    diff_angle_cos = inertia_X * X + inertia_Y * Y
-    diff_angle_cos = np.clip(diff_angle_cos, a_min=-1, a_max=1)
+    diff_angle_cos = inertia_X[:, np.newaxis] * X + inertia_Y[:, np.newaxis] * Y
+    np.clip(diff_angle_cos, -1, 1, out=diff_angle_cos)
     diff_angle = np.arccos(diff_angle_cos)
     diff_angle = (np.pi / 2.0 - np.abs(diff_angle)) / np.pi
 
@@ -145,9 +157,9 @@ def associate(
 
     iou_matrix = asso_func(detections, trackers)
     #iou_matrix = iou_batch(detections, trackers)
-    scores = np.repeat(detections[:, -1][:, np.newaxis], trackers.shape[0], axis=1)
+    scores = detections[:, -1][:, np.newaxis]
     # iou_matrix = iou_matrix * scores # a trick sometiems works, we don't encourage this
-    valid_mask = np.repeat(valid_mask[:, np.newaxis], X.shape[1], axis=1)
+    valid_mask = valid_mask[:, np.newaxis]
 
     angle_diff_cost = (valid_mask * diff_angle) * vdc_weight
     angle_diff_cost = angle_diff_cost.T
@@ -176,29 +188,10 @@ def associate(
     else:
         matched_indices = np.empty(shape=(0, 2))
 
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if d not in matched_indices[:, 0]:
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if t not in matched_indices[:, 1]:
-            unmatched_trackers.append(t)
-
     # filter out matched with low IOU
-    matches = []
-    for m in matched_indices:
-        if iou_matrix[m[0], m[1]] < iou_threshold:
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-        else:
-            matches.append(m.reshape(1, 2))
-    if len(matches) == 0:
-        matches = np.empty((0, 2), dtype=int)
-    else:
-        matches = np.concatenate(matches, axis=0)
-
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+    matched_indices = np.asarray(matched_indices, dtype=int).reshape(-1, 2)
+    low_iou = iou_matrix[matched_indices[:, 0], matched_indices[:, 1]] < iou_threshold
+    return split_matches(matched_indices, len(detections), len(trackers), low_iou)
 
 
 def associate_kitti(
@@ -216,18 +209,16 @@ def associate_kitti(
     """
     Y, X = speed_direction_batch(detections, previous_obs)
     inertia_Y, inertia_X = velocities[:, 0], velocities[:, 1]
-    inertia_Y = np.repeat(inertia_Y[:, np.newaxis], Y.shape[1], axis=1)
-    inertia_X = np.repeat(inertia_X[:, np.newaxis], X.shape[1], axis=1)
-    diff_angle_cos = inertia_X * X + inertia_Y * Y
-    diff_angle_cos = np.clip(diff_angle_cos, a_min=-1, a_max=1)
+    diff_angle_cos = inertia_X[:, np.newaxis] * X + inertia_Y[:, np.newaxis] * Y
+    np.clip(diff_angle_cos, -1, 1, out=diff_angle_cos)
     diff_angle = np.arccos(diff_angle_cos)
     diff_angle = (np.pi / 2.0 - np.abs(diff_angle)) / np.pi
 
     valid_mask = np.ones(previous_obs.shape[0])
     valid_mask[np.where(previous_obs[:, 4] < 0)] = 0
-    valid_mask = np.repeat(valid_mask[:, np.newaxis], X.shape[1], axis=1)
+    valid_mask = valid_mask[:, np.newaxis]
 
-    scores = np.repeat(detections[:, -1][:, np.newaxis], trackers.shape[0], axis=1)
+    scores = detections[:, -1][:, np.newaxis]
     angle_diff_cost = (valid_mask * diff_angle) * vdc_weight
     angle_diff_cost = angle_diff_cost.T
     angle_diff_cost = angle_diff_cost * scores
@@ -259,26 +250,7 @@ def associate_kitti(
     else:
         matched_indices = np.empty(shape=(0, 2))
 
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if d not in matched_indices[:, 0]:
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if t not in matched_indices[:, 1]:
-            unmatched_trackers.append(t)
-
     # filter out matched with low IOU
-    matches = []
-    for m in matched_indices:
-        if iou_matrix[m[0], m[1]] < iou_threshold:
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-        else:
-            matches.append(m.reshape(1, 2))
-    if len(matches) == 0:
-        matches = np.empty((0, 2), dtype=int)
-    else:
-        matches = np.concatenate(matches, axis=0)
-
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+    matched_indices = np.asarray(matched_indices, dtype=int).reshape(-1, 2)
+    low_iou = iou_matrix[matched_indices[:, 0], matched_indices[:, 1]] < iou_threshold
+    return split_matches(matched_indices, len(detections), len(trackers), low_iou)
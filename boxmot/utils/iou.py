@@ -1,6 +1,10 @@
 import numpy as np
 import cv2 as cv
 
+# max (N, M) elements handled in one pass by iou_batch; larger inputs are split into row
+# blocks so that the pairwise temporaries of a block stay cache resident
+IOU_BLOCK_SIZE = 1 << 15
+
 def iou_obb_pair(i, j, bboxes1, bboxes2):
     """
     Compute IoU for the rotated rectangles at index i and j in the batches `bboxes1`, `bboxes2` .
@@ -49,22 +53,32 @@ class AssociationFunction:
 
     @staticmethod
     def iou_batch(bboxes1, bboxes2) -> np.ndarray:
-        bboxes2 = np.expand_dims(bboxes2, 0)
-        bboxes1 = np.expand_dims(bboxes1, 1)
-
-        xx1 = np.maximum(bboxes1[..., 0], bboxes2[..., 0])
-        yy1 = np.maximum(bboxes1[..., 1], bboxes2[..., 1])
-        xx2 = np.minimum(bboxes1[..., 2], bboxes2[..., 2])
-        yy2 = np.minimum(bboxes1[..., 3], bboxes2[..., 3])
-        w = np.maximum(0.0, xx2 - xx1)
-        h = np.maximum(0.0, yy2 - yy1)
-        wh = w * h
-        o = wh / (
-            (bboxes1[..., 2] - bboxes1[..., 0]) * (bboxes1[..., 3] - bboxes1[..., 1]) +
-            (bboxes2[..., 2] - bboxes2[..., 0]) * (bboxes2[..., 3] - bboxes2[..., 1]) -
-            wh
-        )
-        return o
+        # per-coordinate columns: bboxes1 as (N, 1) and bboxes2 as (M,), so the box areas
+        # are computed once per box and only the intersection is broadcast to (N, M)
+        bboxes1 = np.asarray(bboxes1)
+        bboxes2 = np.asarray(bboxes2)
+        dtype = np.result_type(bboxes1, bboxes2, 0.0)  # float, also for integer boxes
+        block_rows = max(1, IOU_BLOCK_SIZE // max(len(bboxes2), 1))
+        if len(bboxes1) > block_rows:
+            iou = np.empty((len(bboxes1), len(bboxes2)), dtype=dtype)
+            for i in range(0, len(bboxes1), block_rows):
+                iou[i:i + block_rows] = AssociationFunction.iou_batch(bboxes1[i:i + block_rows], bboxes2)
+            return iou
+
+        x11, y11, x12, y12 = (bboxes1[:, i, None] for i in range(4))
+        x21, y21, x22, y22 = (bboxes2[:, i] for i in range(4))
+
+        # the (N, M) arithmetic runs in place on the intersection and union buffers
+        w = np.subtract(np.minimum(x12, x22), np.maximum(x11, x21), dtype=dtype)
+        np.maximum(w, 0.0, out=w)
+        h = np.subtract(np.minimum(y12, y22), np.maximum(y11, y21), dtype=dtype)
+        np.maximum(h, 0.0, out=h)
+        wh = w
+        wh *= h
+        union = np.add((x12 - x11) * (y12 - y11), (x22 - x21) * (y22 - y21), dtype=dtype)
+        union -= wh
+        wh /= union
+        return wh
     
     @staticmethod
     def iou_batch_obb(bboxes1, bboxes2) -> np.ndarray:
@@ -90,33 +104,28 @@ class AssociationFunction:
         Returns:
         - hmiou: (N, M) array where hmiou[i, j] is the modified IoU between bboxes1[i] and bboxes2[j]
         """
-        # Expand dimensions for broadcasting
-        bboxes1 = np.expand_dims(bboxes1, axis=1)  # Shape: (N, 1, 4)
-        bboxes2 = np.expand_dims(bboxes2, axis=0)  # Shape: (1, M, 4)
+        # per-coordinate columns, as in iou_batch: areas are computed once per box and
+        # only the pairwise terms are broadcast to (N, M)
+        bboxes1 = np.asarray(bboxes1)
+        bboxes2 = np.asarray(bboxes2)
+        x11, y11, x12, y12 = (bboxes1[:, i, None] for i in range(4))
+        x21, y21, x22, y22 = (bboxes2[:, i] for i in range(4))
 
         # Compute vertical overlap ratio 'o'
-        intersect_y1 = np.maximum(bboxes1[..., 1], bboxes2[..., 1])
-        intersect_y2 = np.minimum(bboxes1[..., 3], bboxes2[..., 3])
-        intersection_height = np.maximum(0.0, intersect_y2 - intersect_y1)
+        inter_y1 = np.maximum(y11, y21)
+        inter_y2 = np.minimum(y12, y22)
+        intersection_height = np.maximum(0.0, inter_y2 - inter_y1)
 
-        union_y1 = np.minimum(bboxes1[..., 1], bboxes2[..., 1])
-        union_y2 = np.maximum(bboxes1[..., 3], bboxes2[..., 3])
-        union_height = np.maximum(1e-10, union_y2 - union_y1)
+        union_height = np.maximum(1e-10, np.maximum(y12, y22) - np.minimum(y11, y21))
 
         o = intersection_height / union_height
 
-        # Compute standard IoU
-        inter_x1 = np.maximum(bboxes1[..., 0], bboxes2[..., 0])
-        inter_y1 = np.maximum(bboxes1[..., 1], bboxes2[..., 1])
-        inter_x2 = np.minimum(bboxes1[..., 2], bboxes2[..., 2])
-        inter_y2 = np.minimum(bboxes1[..., 3], bboxes2[..., 3])
-
-        inter_w = np.maximum(0.0, inter_x2 - inter_x1)
-        inter_h = np.maximum(0.0, inter_y2 - inter_y1)
-        inter_area = inter_w * inter_h
+        # Compute standard IoU, reusing the vertical intersection
+        inter_w = np.maximum(0.0, np.minimum(x12, x22) - np.maximum(x11, x21))
+        inter_area = inter_w * intersection_height
 
-        area1 = (bboxes1[..., 2] - bboxes1[..., 0]) * (bboxes1[..., 3] - bboxes1[..., 1])  # Shape: (N, 1)
-        area2 = (bboxes2[..., 2] - bboxes2[..., 0]) * (bboxes2[..., 3] - bboxes2[..., 1])  # Shape: (1, M)
+        area1 = (x12 - x11) * (y12 - y11)  # Shape: (N, 1)
+        area2 = (x22 - x21) * (y22 - y21)  # Shape: (M,)
 
         union_area = area1 + area2 - inter_area
 
@@ -274,37 +283,33 @@ class AssociationFunction:
         :return:
         """
         # for details should go to https://arxiv.org/pdf/1902.09630.pdf
-        # ensure predict's bbox form
-        bboxes2 = np.expand_dims(bboxes2, 0)
-        bboxes1 = np.expand_dims(bboxes1, 1)
+        # per-coordinate columns, as in iou_batch
+        bboxes1 = np.asarray(bboxes1)
+        bboxes2 = np.asarray(bboxes2)
+        x11, y11, x12, y12 = (bboxes1[:, i, None] for i in range(4))
+        x21, y21, x22, y22 = (bboxes2[:, i] for i in range(4))
 
         # calculate the intersection box
-        xx1 = np.maximum(bboxes1[..., 0], bboxes2[..., 0])
-        yy1 = np.maximum(bboxes1[..., 1], bboxes2[..., 1])
-        xx2 = np.minimum(bboxes1[..., 2], bboxes2[..., 2])
-        yy2 = np.minimum(bboxes1[..., 3], bboxes2[..., 3])
-        w = np.maximum(0.0, xx2 - xx1)
-        h = np.maximum(0.0, yy2 - yy1)
+        w = np.maximum(0.0, np.minimum(x12, x22) - np.maximum(x11, x21))
+        h = np.maximum(0.0, np.minimum(y12, y22) - np.maximum(y11, y21))
         wh = w * h
         iou = wh / (
-            (bboxes1[..., 2] - bboxes1[..., 0]) * (bboxes1[..., 3] - bboxes1[..., 1]) +
-            (bboxes2[..., 2] - bboxes2[..., 0]) * (bboxes2[..., 3] - bboxes2[..., 1]) -
+            (x12 - x11) * (y12 - y11) +
+            (x22 - x21) * (y22 - y21) -
             wh
         )
 
-        centerx1 = (bboxes1[..., 0] + bboxes1[..., 2]) / 2.0
-        centery1 = (bboxes1[..., 1] + bboxes1[..., 3]) / 2.0
-        centerx2 = (bboxes2[..., 0] + bboxes2[..., 2]) / 2.0
-        centery2 = (bboxes2[..., 1] + bboxes2[..., 3]) / 2.0
+        centerx1 = (x11 + x12) / 2.0
+        centery1 = (y11 + y12) / 2.0
+        centerx2 = (x21 + x22) / 2.0
+        centery2 = (y21 + y22) / 2.0
 
         inner_diag = (centerx1 - centerx2) ** 2 + (centery1 - centery2) ** 2
 
-        xxc1 = np.minimum(bboxes1[..., 0], bboxes2[..., 0])
-        yyc1 = np.minimum(bboxes1[..., 1], bboxes2[..., 1])
-        xxc2 = np.maximum(bboxes1[..., 2], bboxes2[..., 2])
-        yyc2 = np.maximum(bboxes1[..., 3], bboxes2[..., 3])
-
-        outer_diag = (xxc2 - xxc1) ** 2 + (yyc2 - yyc1) ** 2
+        outer_diag = (
+            (np.maximum(x12, x22) - np.minimum(x11, x21)) ** 2 +
+            (np.maximum(y12, y22) - np.minimum(y11, y21)) ** 2
+        )
         diou = iou - inner_diag / outer_diag
 
         return (diou + 1) / 2.0 
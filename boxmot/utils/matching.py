@@ -7,6 +7,11 @@ import torch
 from scipy.spatial.distance import cdist
 from boxmot.utils.iou import AssociationFunction
 
+try:
+    import simsimd  # optional SIMD backend for cosine distances
+except ImportError:
+    simsimd = None
+
 
 """
 Table for the 0.95 quantile of the chi-square distribution with N degrees of
@@ -54,21 +59,74 @@ def _indices_to_matches(cost_matrix, indices, thresh):
     return matches, unmatched_a, unmatched_b
 
 
+def _assign_single(cost_matrix, rows, cols, thresh, x, y):
+    """Solve the assignment directly when a single row (or column) is viable.
+
+    The optimum is then the cheapest viable pair, which is what LAPJV would
+    return. Fills `x` and `y` and returns True on success, returns False
+    otherwise.
+    """
+    sub = cost_matrix[np.ix_(rows, cols)]
+    i, j = np.unravel_index(np.argmin(sub), sub.shape)
+    if sub[i, j] >= thresh:
+        return False
+    x[rows[i]] = cols[j]
+    y[cols[j]] = rows[i]
+    return True
+
+
+def _assign_isolated(cost_matrix, viable, rows, cols, thresh, x, y):
+    """Assign the viable pairs that do not compete with any other viable pair.
+
+    A pair that is the only viable entry of both its row and its column forms
+    a component of its own, so LAPJV would match it whenever it is below the
+    threshold, independently of the rest of the matrix. Fills `x` and `y` for
+    those pairs and returns the rows and columns still left for the solver.
+    """
+    sub = viable[np.ix_(rows, cols)]
+    row_single = np.count_nonzero(sub, axis=1) == 1
+    col_single = np.count_nonzero(sub, axis=0) == 1
+    pairs_i, pairs_j = np.nonzero(sub & row_single[:, None] & col_single)
+    pairs_a, pairs_b = rows[pairs_i], cols[pairs_j]
+    keep = cost_matrix[pairs_a, pairs_b] < thresh
+    pairs_a, pairs_b = pairs_a[keep], pairs_b[keep]
+    x[pairs_a] = pairs_b
+    y[pairs_b] = pairs_a
+    return rows[x[rows] < 0], cols[y[cols] < 0]
+
+
 def linear_assignment(cost_matrix, thresh):
     if cost_matrix.size == 0:
         return (
             np.empty((0, 2), dtype=int),
-            tuple(range(cost_matrix.shape[0])),
-            tuple(range(cost_matrix.shape[1])),
+            np.arange(cost_matrix.shape[0]),
+            np.arange(cost_matrix.shape[1]),
         )
-    matches, unmatched_a, unmatched_b = [], [], []
-    cost, x, y = lap.lapjv(cost_matrix, extend_cost=True, cost_limit=thresh)
-    for ix, mx in enumerate(x):
-        if mx >= 0:
-            matches.append([ix, mx])
-    unmatched_a = np.where(x < 0)[0]
-    unmatched_b = np.where(y < 0)[0]
-    matches = np.asarray(matches)
+    # rows / columns without a single pair within the threshold can never be
+    # matched, so only the viable sub-matrix is handed to the solver
+    viable = cost_matrix <= thresh
+    rows = np.flatnonzero(viable.any(axis=1))
+    cols = np.flatnonzero(viable.any(axis=0))
+    x = np.full(cost_matrix.shape[0], -1, dtype=int)
+    y = np.full(cost_matrix.shape[1], -1, dtype=int)
+    if len(rows) == 1 or len(cols) == 1:
+        if _assign_single(cost_matrix, rows, cols, thresh, x, y):
+            rows = cols = rows[:0]
+    elif len(rows) > 1:
+        rows, cols = _assign_isolated(cost_matrix, viable, rows, cols, thresh, x, y)
+    if len(rows):
+        if len(rows) == cost_matrix.shape[0] and len(cols) == cost_matrix.shape[1]:
+            _, x, y = lap.lapjv(cost_matrix, extend_cost=True, cost_limit=thresh)
+        else:
+            _, sub_x, sub_y = lap.lapjv(
+                cost_matrix[np.ix_(rows, cols)], extend_cost=True, cost_limit=thresh
+            )
+            x[rows] = np.where(sub_x >= 0, cols[sub_x], -1)
+            y[cols] = np.where(sub_y >= 0, rows[sub_y], -1)
+    matched_a = np.flatnonzero(x >= 0)
+    matches = np.column_stack((matched_a, x[matched_a]))
+    unmatched_a = np.flatnonzero(x < 0)
+    unmatched_b = np.flatnonzero(y < 0)
     return matches, unmatched_a, unmatched_b
 
 
@@ -109,12 +167,12 @@ def d_iou_distance(atracks, btracks):
         atlbrs = [track.xyxy for track in atracks]
         btlbrs = [track.xyxy for track in btracks]
 
-    ious = np.zeros((len(atlbrs), len(btlbrs)), dtype=np.float32)
-    if ious.size == 0:
-        return ious
-    _ious = AssociationFunction.diou_batch(atlbrs, btlbrs)
+    if len(atlbrs) == 0 or len(btlbrs) == 0:
+        return np.zeros((len(atlbrs), len(btlbrs)), dtype=np.float32)
 
-    cost_matrix = 1 - _ious
+    # the IoU matrix is freshly allocated, so turn it into the cost in place
+    cost_matrix = AssociationFunction.diou_batch(atlbrs, btlbrs)
+    np.subtract(1, cost_matrix, out=cost_matrix)
 
     return cost_matrix
 
@@ -136,12 +194,12 @@ def iou_distance(atracks, btracks):
         atlbrs = [track.xyxy for track in atracks]
         btlbrs = [track.xyxy for track in btracks]
 
-    ious = np.zeros((len(atlbrs), len(btlbrs)), dtype=np.float32)
-    if ious.size == 0:
-        return ious
-    _ious = AssociationFunction.iou_batch(atlbrs, btlbrs)
+    if len(atlbrs) == 0 or len(btlbrs) == 0:
+        return np.zeros((len(atlbrs), len(btlbrs)), dtype=np.float32)
 
-    cost_matrix = 1 - _ious
+    # the IoU matrix is freshly allocated, so turn it into the cost in place
+    cost_matrix = AssociationFunction.iou_batch(atlbrs, btlbrs)
+    np.subtract(1, cost_matrix, out=cost_matrix)
 
     return cost_matrix
 
@@ -169,28 +227,119 @@ def v_iou_distance(atracks, btracks):
     return cost_matrix
 
 
-def embedding_distance(tracks, detections, metric="cosine"):
+def _simsimd_cosine_cdist(a, b):
+    dtype = np.result_type(a, b)  # simsimd needs both operands in one dtype
+    a = np.ascontiguousarray(a, dtype=dtype)
+    b = np.ascontiguousarray(b, dtype=dtype)
+    return np.asarray(simsimd.cdist(a, b, metric="cosine"), dtype=np.float32)
+
+
+def _numpy_cosine_cdist(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    dist = a @ b.T
+    np.subtract(1.0, dist, out=dist)
+    return dist.astype(np.float32, copy=False)
+
+
+# Pairwise cosine distance between the rows of a (N, D) and b (M, D) -> (N, M) float32.
+# The backend is picked once at import: SimSIMD when installed, otherwise a numpy GEMM.
+cosine_cdist = _simsimd_cosine_cdist if simsimd is not None else _numpy_cosine_cdist
+
+
+def quantize_features(features):
+    """
+    L2-normalize features and quantize them to int8 with a fixed scale of 127.
+    :param features: np.ndarray (N, D) float features
+    :return: np.ndarray (N, D) int8
+    """
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    features = features / np.maximum(norms, 1e-12)
+    return np.round(np.clip(features, -1.0, 1.0) * 127).astype(np.int8)
+
+
+def _int8_cosine_distance(a, b):
+    """Cosine distance between int8 features, accumulated in int32."""
+    if simsimd is not None:
+        # dispatches to VNNI / SDOT int8 dot-product kernels
+        return np.asarray(simsimd.cdist(a, b, metric="cosine"), dtype=np.float32)
+    a = a.astype(np.int32)
+    b = b.astype(np.int32)
+    norms = np.sqrt(np.einsum("ij,ij->i", a, a))[:, None] * np.sqrt(np.einsum("ij,ij->i", b, b))[None, :]
+    return (1.0 - (a @ b.T) / np.maximum(norms, 1.0)).astype(np.float32)
+
+
+def _half_cosine_distance(a, b):
+    """Cosine distance between float16 features, accumulated in float32."""
+    if simsimd is not None:
+        # dispatches to AVX-512-FP16 / NEON fp16 kernels
+        return np.asarray(simsimd.cdist(a, b, metric="cosine"), dtype=np.float32)
+    return _numpy_cosine_cdist(a.astype(np.float32), b.astype(np.float32))
+
+
+def embedding_distance(tracks, detections, metric="cosine", quantize=False, gate=None, half=False, normalized=False):
     """
     :param tracks: list[STrack]
     :param detections: list[BaseTrack]
     :param metric:
+    :param quantize: compute the cosine distance on int8-quantized features
+    :param half: compute the cosine distance on float16 features
+    :param normalized: the features are already L2-normalized, so the cosine
+        distance is taken straight from one GEMM without renormalizing them
+    :param gate: optional bool mask (len(tracks), len(detections)) of the pairs
+        worth evaluating with the cosine metric; every other pair is set to the
+        maximum cosine distance (2.0)
     :return: cost_matrix np.ndarray
     """
 
     cost_matrix = np.zeros((len(tracks), len(detections)), dtype=np.float32)
     if cost_matrix.size == 0:
         return cost_matrix
+    if gate is not None and metric == "cosine" and not (quantize or half):
+        rows, cols = np.nonzero(gate)
+        if len(rows) < cost_matrix.size // 4:
+            # sparse gate: only take the dot products of the surviving pairs
+            cost_matrix.fill(2.0)
+            if len(rows):
+                track_features = np.asarray(
+                    [tracks[i].smooth_feat for i in rows], dtype=np.float32
+                )
+                det_features = np.asarray(
+                    [detections[j].curr_feat for j in cols], dtype=np.float32
+                )
+                sims = np.einsum("ij,ij->i", track_features, det_features)
+                if not normalized:
+                    # same cosine as the dense path, which renormalizes in cosine_cdist
+                    sims /= np.linalg.norm(track_features, axis=1) * np.linalg.norm(det_features, axis=1)
+                cost_matrix[rows, cols] = np.maximum(0.0, 1.0 - sims)
+            return cost_matrix
     det_features = np.asarray(
         [track.curr_feat for track in detections], dtype=np.float32
     )
-    # for i, track in enumerate(tracks):
-    # cost_matrix[i, :] = np.maximum(0.0, cdist(track.smooth_feat.reshape(1,-1), det_features, metric))
     track_features = np.asarray(
         [track.smooth_feat for track in tracks], dtype=np.float32
     )
-    cost_matrix = np.maximum(
-        0.0, cdist(track_features, det_features, metric)
-    )  # Nomalized features
+    if metric == "cosine":
+        if quantize:
+            cost_matrix = _int8_cosine_distance(
+                quantize_features(track_features), quantize_features(det_features)
+            )
+        elif half:
+            cost_matrix = _half_cosine_distance(
+                track_features.astype(np.float16), det_features.astype(np.float16)
+            )
+        elif normalized:
+            # turn the fresh GEMM output into the distance in place
+            cost_matrix = track_features @ det_features.T
+            np.subtract(1.0, cost_matrix, out=cost_matrix)
+        else:
+            cost_matrix = cosine_cdist(track_features, det_features)
+        np.maximum(0.0, cost_matrix, out=cost_matrix)
+        if gate is not None:
+            cost_matrix[~gate] = 2.0
+    else:
+        cost_matrix = cdist(track_features, det_features, metric)
+        np.maximum(0.0, cost_matrix, out=cost_matrix)
     return cost_matrix
 
 
@@ -231,7 +380,6 @@ def fuse_iou(cost_matrix, tracks, detections):
     iou_sim = 1 - iou_dist
     fuse_sim = reid_sim * (1 + iou_sim) / 2
     det_confs = np.array([det.conf for det in detections])
-    det_confs = np.expand_dims(det_confs, axis=0).repeat(cost_matrix.shape[0], axis=0)
     # fuse_sim = fuse_sim * (1 + det_confs) / 2
     fuse_cost = 1 - fuse_sim
     return fuse_cost
@@ -240,12 +388,11 @@ def fuse_iou(cost_matrix, tracks, detections):
 def fuse_score(cost_matrix, detections):
     if cost_matrix.size == 0:
         return cost_matrix
-    iou_sim = 1 - cost_matrix
     det_confs = np.array([det.conf for det in detections])
-    det_confs = np.expand_dims(det_confs, axis=0).repeat(cost_matrix.shape[0], axis=0)
-    fuse_sim = iou_sim * det_confs
-    fuse_cost = 1 - fuse_sim
-    return fuse_cost
+    # fused in place: callers always rebind the result and never reuse the input
+    np.subtract(1, cost_matrix, out=cost_matrix)
+    cost_matrix *= det_confs[None, :]
+    return np.subtract(1, cost_matrix, out=cost_matrix)
 
 
 def _pdist(a, b):
@@ -267,7 +414,7 @@ def _pdist(a, b):
         return np.zeros((len(a), len(b)))
     a2, b2 = np.square(a).sum(axis=1), np.square(b).sum(axis=1)
     r2 = -2.0 * np.dot(a, b.T) + a2[:, None] + b2[None, :]
-    r2 = np.clip(r2, 0.0, float(np.inf))
+    np.maximum(r2, 0.0, out=r2)
     return r2
 
 
@@ -351,9 +498,10 @@ class NearestNeighborDistanceMetric(object):
         the oldest samples when the budget is reached.
     Attributes
     ----------
-    samples : Dict[int -> List[ndarray]]
-        A dictionary that maps from target identities to the list of samples
-        that have been observed so far.
+    samples : Dict[int -> ndarray]
+        A dictionary that maps from target identities to the samples that have
+        been observed so far, one per row. Once the budget is reached the rows
+        are kept in a ring buffer, so they are not in chronological order.
     """
 
     def __init__(self, metric, matching_threshold, budget=None):
@@ -366,6 +514,7 @@ class NearestNeighborDistanceMetric(object):
         self.matching_threshold = matching_threshold
         self.budget = budget
         self.samples = {}
+        self._buffers = {}  # target -> [preallocated rows, count, ring head]
 
     def partial_fit(self, features, targets, active_targets):
         """Update the distance metric with new data.
@@ -379,10 +528,27 @@ class NearestNeighborDistanceMetric(object):
             A list of targets that are currently present in the scene.
         """
         for feature, target in zip(features, targets):
-            self.samples.setdefault(target, []).append(feature)
-            if self.budget is not None:
-                self.samples[target] = self.samples[target][-self.budget:]
-        self.samples = {k: self.samples[k] for k in active_targets}
+            self._add_sample(target, feature)
+        self._buffers = {k: self._buffers[k] for k in active_targets}
+        self.samples = {k: buf[:count] for k, (buf, count, _) in self._buffers.items()}
+
+    def _add_sample(self, target, feature):
+        """Write `feature` into the sample buffer of `target`, overwriting the
+        oldest sample once the budget is reached."""
+        entry = self._buffers.get(target)
+        if entry is None:
+            entry = self._buffers[target] = [
+                np.empty((self.budget or 16, len(feature)), dtype=feature.dtype), 0, 0
+            ]
+        buf, count, head = entry
+        if count < len(buf) or not self.budget:
+            if count == len(buf):
+                buf = entry[0] = np.concatenate((buf, np.empty_like(buf)))
+            buf[count] = feature
+            entry[1] = count + 1
+        else:
+            buf[head] = feature
+            entry[2] = (head + 1) % len(buf)
 
     def distance(self, features, targets):
         """Compute distance between features and targets.
@@ -16,10 +16,8 @@ def xyxy2xywh(x):
        y (np.ndarray) or (torch.Tensor): The bounding box coordinates in (x, y, width, height) format.
     """
     y = x.clone() if isinstance(x, torch.Tensor) else np.copy(x)
-    y[..., 0] = (x[..., 0] + x[..., 2]) / 2  # x center
-    y[..., 1] = (x[..., 1] + x[..., 3]) / 2  # y center
-    y[..., 2] = x[..., 2] - x[..., 0]  # width
-    y[..., 3] = x[..., 3] - x[..., 1]  # height
+    y[..., 0:2] = (x[..., 0:2] + x[..., 2:4]) * 0.5  # x, y center
+    y[..., 2:4] = x[..., 2:4] - x[..., 0:2]  # width, height
     return y
 
 
@@ -35,10 +33,9 @@ def xywh2xyxy(x):
         y (np.ndarray) or (torch.Tensor): The bounding box coordinates in (x1, y1, x2, y2) format.
     """
     y = x.clone() if isinstance(x, torch.Tensor) else np.copy(x)
-    y[..., 0] = x[..., 0] - x[..., 2] / 2  # top left x
-    y[..., 1] = x[..., 1] - x[..., 3] / 2  # top left y
-    y[..., 2] = x[..., 0] + x[..., 2] / 2  # bottom right x
-    y[..., 3] = x[..., 1] + x[..., 3] / 2  # bottom right y
+    half_wh = x[..., 2:4] * 0.5
+    y[..., 0:2] = x[..., 0:2] - half_wh  # top left x, y
+    y[..., 2:4] = x[..., 0:2] + half_wh  # bottom right x, y
     return y
 
 
@@ -53,10 +50,7 @@ def xywh2tlwh(x):
         y (np.ndarray) or (torch.Tensor): The bounding box coordinates in (x1, y1, x2, y2) format.
     """
     y = x.clone() if isinstance(x, torch.Tensor) else np.copy(x)
-    y[..., 0] = x[..., 0] - x[..., 2] / 2.0  # xc --> t
-    y[..., 1] = x[..., 1] - x[..., 3] / 2.0  # yc --> l
-    y[..., 2] = x[..., 2]                    # width
-    y[..., 3] = x[..., 3]                    # height
+    y[..., 0:2] = x[..., 0:2] - x[..., 2:4] * 0.5  # xc, yc --> t, l; width, height are copied
     return y
 
 
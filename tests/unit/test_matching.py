@@ -0,0 +1,229 @@
+import numpy as np
+from scipy.spatial.distance import cdist
+from types import SimpleNamespace
+
+from boxmot.utils.association import remove_indices, split_matches
+from boxmot.utils.matching import (NearestNeighborDistanceMetric, _half_cosine_distance, _numpy_cosine_cdist,
+                                   cosine_cdist, embedding_distance, linear_assignment)
+
+
+def _normalized(n, d, seed):
+    feats = np.random.default_rng(seed).normal(size=(n, d)).astype(np.float32)
+    return feats / np.linalg.norm(feats, axis=1, keepdims=True)
+
+
+def test_embedding_distance_matches_cdist():
+    track_feats = _normalized(5, 128, 0)
+    det_feats = _normalized(7, 128, 1)
+    tracks = [SimpleNamespace(smooth_feat=f) for f in track_feats]
+    detections = [SimpleNamespace(curr_feat=f) for f in det_feats]
+
+    cost = embedding_distance(tracks, detections)
+
+    assert cost.shape == (5, 7)
+    np.testing.assert_allclose(cost, cdist(track_feats, det_feats, "cosine"), atol=1e-5)
+
+
+def test_embedding_distance_empty():
+    tracks = [SimpleNamespace(smooth_feat=f) for f in _normalized(3, 16, 0)]
+    assert embedding_distance(tracks, []).shape == (3, 0)
+
+
+def test_embedding_distance_quantized():
+    track_feats = _normalized(5, 512, 0)
+    det_feats = _normalized(7, 512, 1)
+    tracks = [SimpleNamespace(smooth_feat=f) for f in track_feats]
+    detections = [SimpleNamespace(curr_feat=f) for f in det_feats]
+
+    cost = embedding_distance(tracks, detections, quantize=True)
+
+    np.testing.assert_allclose(cost, cdist(track_feats, det_feats, "cosine"), atol=2e-2)
+
+
+def test_embedding_distance_quantized_non_unit_features():
+    rng = np.random.default_rng(0)
+    track_feats = rng.normal(size=(5, 512)) * 3.0
+    det_feats = rng.normal(size=(7, 512)) * 0.2
+    tracks = [SimpleNamespace(smooth_feat=f) for f in track_feats]
+    detections = [SimpleNamespace(curr_feat=f) for f in det_feats]
+
+    cost = embedding_distance(tracks, detections, quantize=True)
+
+    np.testing.assert_allclose(cost, cdist(track_feats, det_feats, "cosine"), atol=2e-2)
+
+
+def test_embedding_distance_gated():
+    track_feats = _normalized(6, 64, 0)
+    det_feats = _normalized(8, 64, 1)
+    tracks = [SimpleNamespace(smooth_feat=f) for f in track_feats]
+    detections = [SimpleNamespace(curr_feat=f) for f in det_feats]
+    full = cdist(track_feats, det_feats, "cosine")
+
+    for density in (0.1, 0.9):
+        gate = np.random.default_rng(2).random(full.shape) < density
+        cost = embedding_distance(tracks, detections, gate=gate)
+        np.testing.assert_allclose(cost[gate], full[gate], atol=1e-5)
+        assert np.all(cost[~gate] == 2.0)
+
+
+def test_embedding_distance_sparse_gate_matches_dense_on_non_unit_features():
+    rng = np.random.default_rng(0)
+    track_feats = rng.normal(size=(6, 64)).astype(np.float32) * 3.0
+    det_feats = rng.normal(size=(8, 64)).astype(np.float32) * 0.5
+    tracks = [SimpleNamespace(smooth_feat=f) for f in track_feats]
+    detections = [SimpleNamespace(curr_feat=f) for f in det_feats]
+
+    gate = np.zeros((6, 8), dtype=bool)
+    gate[[0, 2, 5], [1, 4, 7]] = True  # well below a quarter of the pairs -> sparse path
+    sparse = embedding_distance(tracks, detections, gate=gate)
+    dense = embedding_distance(tracks, detections)
+
+    np.testing.assert_allclose(sparse[gate], dense[gate], atol=1e-5)
+    assert np.all(sparse[~gate] == 2.0)
+
+
+def test_nn_metric_budget_keeps_latest_samples():
+    metric = NearestNeighborDistanceMetric("cosine", 0.2, budget=3)
+    feats = _normalized(5, 16, 0)
+    for f in feats:
+        metric.partial_fit(f[None], np.array([1]), [1])
+
+    assert len(metric.samples[1]) == 3
+    np.testing.assert_allclose(np.sort(metric.samples[1], axis=0), np.sort(feats[-3:], axis=0))
+    cost = metric.distance(feats, [1])
+    np.testing.assert_allclose(cost[0, -3:], 0.0, atol=1e-5)
+
+
+def test_linear_assignment_skips_unviable_rows_and_cols():
+    cost = np.array([
+        [0.1, 0.9, 0.9],
+        [0.9, 0.9, 0.9],
+        [0.9, 0.9, 0.2],
+    ])
+    matches, u_a, u_b = linear_assignment(cost, thresh=0.5)
+
+    np.testing.assert_array_equal(matches, [[0, 0], [2, 2]])
+    np.testing.assert_array_equal(u_a, [1])
+    np.testing.assert_array_equal(u_b, [1])
+
+    matches, u_a, u_b = linear_assignment(np.ones((2, 3)), thresh=0.5)
+    assert matches.shape == (0, 2)
+    np.testing.assert_array_equal(u_a, [0, 1])
+    np.testing.assert_array_equal(u_b, [0, 1, 2])
+
+    matches, u_a, u_b = linear_assignment(np.empty((3, 0)), thresh=0.5)
+    assert matches.shape == (0, 2)
+    assert isinstance(u_a, np.ndarray) and isinstance(u_b, np.ndarray)
+    np.testing.assert_array_equal(u_a, [0, 1, 2])
+    assert u_b.size == 0
+
+
+def test_embedding_distance_half():
+    track_feats = _normalized(5, 512, 0)
+    det_feats = _normalized(7, 512, 1)
+    tracks = [SimpleNamespace(smooth_feat=f) for f in track_feats]
+    detections = [SimpleNamespace(curr_feat=f) for f in det_feats]
+
+    cost = embedding_distance(tracks, detections, half=True)
+
+    assert cost.dtype == np.float32
+    np.testing.assert_allclose(cost, cdist(track_feats, det_feats, "cosine"), atol=2e-3)
+
+
+def test_half_cosine_distance_renormalizes():
+    rng = np.random.default_rng(0)
+    a = (rng.normal(size=(4, 64)) * 3.0).astype(np.float16)
+    b = (rng.normal(size=(6, 64)) * 0.5).astype(np.float16)
+
+    cost = _half_cosine_distance(a, b)
+
+    np.testing.assert_allclose(cost, cdist(a.astype(np.float64), b.astype(np.float64), "cosine"), atol=2e-3)
+
+
+def test_cosine_cdist_backends_match_scipy():
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(4, 32)).astype(np.float32) * 3.0
+    b = rng.normal(size=(6, 32)).astype(np.float32)
+
+    expected = cdist(a, b, "cosine")
+    np.testing.assert_allclose(cosine_cdist(a, b), expected, atol=1e-5)
+    np.testing.assert_allclose(_numpy_cosine_cdist(a, b), expected, atol=1e-5)
+    np.testing.assert_allclose(cosine_cdist(a.astype(np.float64), b), expected, atol=1e-5)
+
+
+def test_split_matches_appends_rejected_pairs_after_unassigned():
+    matched = np.array([[0, 2], [3, 0], [1, 1]])
+    rejected = np.array([False, True, False])
+
+    matches, u_dets, u_trks = split_matches(matched, 5, 4, rejected)
+
+    np.testing.assert_array_equal(matches, [[0, 2], [1, 1]])
+    np.testing.assert_array_equal(u_dets, [2, 4, 3])
+    np.testing.assert_array_equal(u_trks, [3, 0])
+
+
+def test_embedding_distance_normalized_matches_cdist():
+    track_feats = _normalized(5, 128, 0)
+    det_feats = _normalized(7, 128, 1)
+    tracks = [SimpleNamespace(smooth_feat=f) for f in track_feats]
+    detections = [SimpleNamespace(curr_feat=f) for f in det_feats]
+
+    cost = embedding_distance(tracks, detections, normalized=True)
+
+    assert cost.dtype == np.float32
+    np.testing.assert_allclose(cost, cdist(track_feats, det_feats, "cosine"), atol=1e-5)
+
+
+def test_linear_assignment_uncontested_pairs():
+    cost = np.array([
+        [0.9, 0.3, 0.1],
+        [0.9, 0.9, 0.9],
+    ])
+    matches, u_a, u_b = linear_assignment(cost, thresh=0.5)
+    np.testing.assert_array_equal(matches, [[0, 2]])
+    np.testing.assert_array_equal(u_a, [1])
+    np.testing.assert_array_equal(u_b, [0, 1])
+
+    cost = np.array([
+        [0.9, 0.2, 0.9],
+        [0.3, 0.9, 0.9],
+        [0.9, 0.9, 0.9],
+    ])
+    matches, u_a, u_b = linear_assignment(cost, thresh=0.5)
+    np.testing.assert_array_equal(matches, [[0, 1], [1, 0]])
+    np.testing.assert_array_equal(u_a, [2])
+    np.testing.assert_array_equal(u_b, [2])
+
+
+def test_linear_assignment_isolated_pairs_with_contested_rest():
+    # row 0 / col 0 is isolated; rows 1-2 compete for cols 1-2
+    cost = np.array([
+        [0.1, 0.9, 0.9, 0.9],
+        [0.9, 0.2, 0.3, 0.9],
+        [0.9, 0.1, 0.4, 0.9],
+    ])
+    matches, u_a, u_b = linear_assignment(cost, thresh=0.5)
+    np.testing.assert_array_equal(matches, [[0, 0], [1, 2], [2, 1]])
+    assert u_a.size == 0
+    np.testing.assert_array_equal(u_b, [3])
+
+
+def test_remove_indices_matches_setdiff1d():
+    indices = np.array([4, 0, 7, 2])  # unsorted, as returned by split_matches with rejections
+    np.testing.assert_array_equal(remove_indices(indices, [7, 0]), np.setdiff1d(indices, [7, 0]))
+    np.testing.assert_array_equal(remove_indices(indices, []), np.setdiff1d(indices, []))
+    assert remove_indices(np.array([], dtype=int), []).size == 0
+
+
+def test_iou_batch_row_blocks_match_single_pass(monkeypatch):
+    from boxmot.utils import iou
+
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, 500, size=(2, 40, 2))
+    bboxes1 = np.hstack((xy[0], xy[0] + rng.uniform(10, 80, size=(40, 2))))
+    bboxes2 = np.hstack((xy[1], xy[1] + rng.uniform(10, 80, size=(40, 2))))[:25]
+
+    expected = iou.AssociationFunction.iou_batch(bboxes1, bboxes2)
+    monkeypatch.setattr(iou, "IOU_BLOCK_SIZE", 3 * len(bboxes2))  # 3 rows per block, ragged tail
+
+    np.testing.assert_array_equal(iou.AssociationFunction.iou_batch(bboxes1, bboxes2), expected)
@@ -177,4 +177,187 @@ def test_tracker_with_no_detections(tracker_type, dets):
     embs = np.random.random(size=(2, 512))
     
     output = tracker.update(dets, rgb, embs)
-    assert output.size == 0, "Output should be empty when no detections are provided"
\ No newline at end of file
+    assert output.size == 0, "Output should be empty when no detections are provided"
+
+
+def test_remove_duplicate_stracks_keeps_older_track():
+    from types import SimpleNamespace
+    from boxmot.trackers.botsort.botsort_utils import remove_duplicate_stracks
+
+    def strack(box, start_frame):
+        return SimpleNamespace(xyxy=np.array(box, dtype=float), frame_id=10, start_frame=start_frame)
+
+    a = [strack([0, 0, 10, 10], 2), strack([50, 50, 60, 60], 8), strack([100, 100, 110, 110], 5)]
+    b = [strack([0, 0, 10, 10], 6), strack([50, 50, 60, 60], 3), strack([100, 100, 110, 110], 5)]
+
+    resa, resb = remove_duplicate_stracks(a, b)
+
+    # the younger duplicate is dropped; equal ages drop the track from the first list
+    assert resa == [a[0]]
+    assert resb == [b[1], b[2]]
+
+
+def test_run_pipeline_matches_sequential_update():
+    from boxmot.trackers.bytetrack.basetrack import BaseTrack
+
+    tracker_conf = get_tracker_config('bytetrack')
+    piped = create_tracker('bytetrack', tracker_conf, None, 'cpu', False, False)
+    sequential = create_tracker('bytetrack', tracker_conf, None, 'cpu', False, False)
+
+    rgb = np.zeros((640, 640, 3), dtype=np.uint8)
+    frames = [rgb.copy() for _ in range(10)]
+
+    def detect(frame):
+        return np.array([[144, 212, 400, 480, 0.82, 0],
+                         [425, 281, 576, 472, 0.72, 65]])
+
+    outputs = {}
+    BaseTrack.clear_count()  # track ids come from a class-wide counter
+    n = piped.run_pipeline(frames, detect, sink=lambda i, img, tracks: outputs.__setitem__(i, tracks), plot=False)
+
+    assert n == len(frames)
+    BaseTrack.clear_count()
+    for i, frame in enumerate(frames):
+        assert_allclose(outputs[i], sequential.update(detect(frame), frame))
+
+
+def test_run_pipeline_raises_when_sink_fails():
+    import threading
+    import time
+
+    tracker = create_tracker('bytetrack', get_tracker_config('bytetrack'), None, 'cpu', False, False)
+
+    def frames():
+        for _ in range(50):
+            time.sleep(0.2)
+            yield np.zeros((640, 640, 3), dtype=np.uint8)
+
+    def detect(frame):
+        return np.array([[144, 212, 400, 480, 0.82, 0]])
+
+    def sink(i, img, tracks):
+        raise RuntimeError("sink failed")
+
+    errors = []
+
+    def run():
+        try:
+            tracker.run_pipeline(frames(), detect, sink=sink, plot=False)
+        except RuntimeError as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+
+    assert not worker.is_alive(), "run_pipeline should stop once the sink fails"
+    assert len(errors) == 1 and str(errors[0]) == "sink failed"
+
+
+def test_track_windows_stitches_ids_across_windows():
+    from functools import partial
+    from boxmot.trackers.windowed import track_windows
+
+    # a single box moving right by 2px per frame for 60 frames
+    dets_n_embs = np.array([[f, 100 + 2 * f, 100, 150 + 2 * f, 200, 0.9, 0] for f in range(1, 61)], dtype=float)
+    make_tracker = partial(create_tracker, 'ocsort', get_tracker_config('ocsort'))
+    blank = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    results = track_windows(make_tracker, dets_n_embs, lambda _: blank, window_size=20, overlap=10, n_jobs=2)
+
+    assert len(np.unique(results[:, 5])) == 1, "the track should keep its id across window boundaries"
+    assert len(np.unique(results[:, 0])) == len(results), "warm-up frames should not be duplicated"
+
+
+@pytest.mark.parametrize("KalmanFilter", ["xywh", "xyah"])
+def test_kf_multi_update_matches_update(KalmanFilter):
+    from boxmot.motion.kalman_filters.aabb.xyah_kf import KalmanFilterXYAH
+    from boxmot.motion.kalman_filters.aabb.xywh_kf import KalmanFilterXYWH
+
+    kf = {"xywh": KalmanFilterXYWH, "xyah": KalmanFilterXYAH}[KalmanFilter]()
+    rng = np.random.default_rng(0)
+    boxes = rng.uniform(20, 200, size=(5, 4))
+    states = [kf.predict(*kf.initiate(box)) for box in boxes]
+    measurements = boxes + rng.normal(scale=2.0, size=boxes.shape)
+    confs = rng.uniform(0.3, 0.9, size=len(boxes))
+
+    means, covs = kf.multi_update(
+        np.stack([m for m, _ in states]), np.stack([c for _, c in states]), measurements, confs
+    )
+
+    for (mean, cov), measurement, conf, multi_mean, multi_cov in zip(states, measurements, confs, means, covs):
+        expected_mean, expected_cov = kf.update(mean, cov, measurement, conf)
+        assert_allclose(multi_mean, expected_mean, rtol=1e-6, atol=1e-8)
+        assert_allclose(multi_cov, expected_cov, rtol=1e-6, atol=1e-8)
+
+
+@pytest.mark.parametrize("KalmanFilter", ["xywh", "xyah"])
+def test_kf_multi_predict_matches_predict(KalmanFilter):
+    from boxmot.motion.kalman_filters.aabb.xyah_kf import KalmanFilterXYAH
+    from boxmot.motion.kalman_filters.aabb.xywh_kf import KalmanFilterXYWH
+
+    kf = {"xywh": KalmanFilterXYWH, "xyah": KalmanFilterXYAH}[KalmanFilter]()
+    boxes = np.random.default_rng(0).uniform(20, 200, size=(5, 4))
+    states = [kf.initiate(box) for box in boxes]
+
+    means, covs = kf.multi_predict(np.stack([m for m, _ in states]), np.stack([c for _, c in states]))
+
+    for (mean, cov), multi_mean, multi_cov in zip(states, means, covs):
+        expected_mean, expected_cov = kf.predict(mean, cov)
+        assert_allclose(multi_mean, expected_mean, rtol=1e-6, atol=1e-8)
+        assert_allclose(multi_cov, expected_cov, rtol=1e-6, atol=1e-8)
+
+
+@pytest.mark.parametrize("KalmanFilter", ["xywh", "xyah"])
+def test_kf_multi_initiate_matches_initiate(KalmanFilter):
+    from boxmot.motion.kalman_filters.aabb.xyah_kf import KalmanFilterXYAH
+    from boxmot.motion.kalman_filters.aabb.xywh_kf import KalmanFilterXYWH
+
+    kf = {"xywh": KalmanFilterXYWH, "xyah": KalmanFilterXYAH}[KalmanFilter]()
+    boxes = np.random.default_rng(0).uniform(20, 200, size=(5, 4))
+
+    means, covs = kf.multi_initiate(boxes)
+
+    for box, multi_mean, multi_cov in zip(boxes, means, covs):
+        expected_mean, expected_cov = kf.initiate(box)
+        assert_allclose(multi_mean, expected_mean)
+        assert_allclose(multi_cov, expected_cov)
+
+
+def test_strongsort_multi_camera_update_matches_camera_update():
+    from boxmot.trackers.strongsort.sort.detection import Detection
+    from boxmot.trackers.strongsort.sort.track import Track
+
+    def make_tracks():
+        boxes = [[10, 20, 50, 80], [200, 150, 40, 60], [320, 40, 25, 70]]
+        return [Track(Detection(np.array(b, dtype=float), 0.9, 0, i, None), i, 3, 30, 0.9)
+                for i, b in enumerate(boxes)]
+
+    warp = np.array([[0.99, -0.02, 3.5], [0.02, 0.99, -2.0]])
+    batched, single = make_tracks(), make_tracks()
+
+    Track.multi_camera_update(batched, warp)
+    for track in single:
+        track.camera_update(warp)
+
+    for b, s in zip(batched, single):
+        assert_allclose(b.mean, s.mean)
+
+
+def test_botsort_cmc_worker_is_lazy_and_copyable():
+    import copy
+
+    tracker = BotSort(
+        reid_weights=Path(WEIGHTS / 'osnet_x0_25_msmt17.pt'),
+        device='cpu',
+        half=False,
+    )
+    assert tracker._cmc_worker is None
+
+    worker = tracker._get_cmc_worker()
+    assert tracker._get_cmc_worker() is worker
+    assert copy.deepcopy(tracker)._cmc_worker is None
+
+    tracker.close()
+    assert tracker._cmc_worker is None
+    tracker.close()  # idempotent
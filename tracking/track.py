@@ -114,9 +114,9 @@ def run(args):
 
     for r in results:
 
-        img = yolo.predictor.trackers[0].plot_results(r.orig_img, args.show_trajectories)
-
+        # drawing is only needed for the preview window; without it, just drain the stream
         if args.show is True:
+            img = yolo.predictor.trackers[0].plot_results(r.orig_img, args.show_trajectories)
             cv2.imshow('BoxMOT', img)     
             key = cv2.waitKey(1) & 0xFF
             if key == ord(' ') or key == ord('q'):